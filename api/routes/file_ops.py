@@ -1,6 +1,6 @@
 """
 文件操作API路由
-包含文件列表、复制、移动、删除、重命名、创建文件夹等操作
+包含文件列表、复制、移动、删除、重命名、创建文件夹、后台任务查询等操作
 """
 
 from flask import Blueprint, request, jsonify, current_app
@@ -36,8 +36,22 @@ def list_directory():
         
         logger.info(f"用户 {current_user['email']} 列出目录: {directory_path}")
         
+        # 可选分页参数，不传limit时返回完整列表
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', type=int)
+        if offset < 0 or (limit is not None and limit <= 0):
+            return jsonify({
+                'success': False,
+                'message': '分页参数无效'
+            }), 400
+        
         file_service = FileService()
-        result = file_service.list_directory(directory_path, user_ip, user_agent, current_user)
+        if request.args.get('format') == 'columns':
+            # 列式结构，适合大目录
+            result = file_service.list_directory_columnar(directory_path, user_ip, user_agent, current_user)
+        else:
+            result = file_service.list_directory(directory_path, user_ip, user_agent, current_user,
+                                                 offset=offset, limit=limit)
         
         return jsonify(result)
         
@@ -201,7 +215,11 @@ def move_file():
         logger.info(f"用户 {current_user['email']} 移动文件/目录: {source_path} -> {target_path}")
         
         file_service = FileService()
-        result = file_service.move_file(source_path, target_path, user_ip, user_agent, current_user)
+        if data.get('background'):
+            # 后台执行，立即返回任务ID，客户端通过 /api/tasks/<task_id> 查询进度
+            result = file_service.submit_move_task(source_path, target_path, user_ip, user_agent, current_user)
+        else:
+            result = file_service.move_file(source_path, target_path, user_ip, user_agent, current_user)
         
         return jsonify(result)
         
@@ -233,7 +251,11 @@ def copy_file():
         logger.info(f"用户 {current_user['email']} 复制文件/目录: {source_path} -> {target_path}")
         
         file_service = FileService()
-        result = file_service.copy_file(source_path, target_path, user_ip, user_agent, current_user)
+        if data.get('background'):
+            # 后台执行，立即返回任务ID，客户端通过 /api/tasks/<task_id> 查询进度
+            result = file_service.submit_copy_task(source_path, target_path, user_ip, user_agent, current_user)
+        else:
+            result = file_service.copy_file(source_path, target_path, user_ip, user_agent, current_user)
         
         return jsonify(result)
         
@@ -244,6 +266,27 @@ def copy_file():
             'message': str(e)
         }), 500
 
+@bp.route('/tasks/<task_id>', methods=['GET'])
+@require_auth_api
+def get_task_status(task_id):
+    """获取后台复制/移动任务状态"""
+    try:
+        current_user = get_current_user()
+        
+        file_service = FileService()
+        result = file_service.get_task_status(task_id, current_user)
+        
+        if not result.get('success'):
+            return jsonify(result), 404
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"获取任务状态失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
 @bp.route('/search', methods=['GET'])
 @require_auth_api
 def search_files():
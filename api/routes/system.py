@@ -10,6 +10,7 @@ import psutil
 import platform
 from services.redis_service import get_redis_service
 from services.cache_service import get_cache_service
+from services.log_maintenance_service import get_log_maintenance_service
 from utils.performance_monitor import get_performance_monitor
 from utils.logger import get_logger
 from utils.auth_middleware import require_auth_api, require_admin, get_current_user
@@ -346,8 +347,9 @@ def cleanup_old_logs():
                 'message': 'retention_days必须是大于0的整数'
             }), 400
         
-        cleanup_result = mysql_service.cleanup_old_logs(retention_days)
-        return jsonify(cleanup_result)
+        # 清理可能耗时数分钟，交给日志维护服务后台执行，通过任务ID查询结果
+        job = get_log_maintenance_service().manual_cleanup(retention_days)
+        return jsonify(job), 202
         
     except Exception as e:
         logger.error(f"清理过期日志失败: {str(e)}")
@@ -368,8 +370,8 @@ def optimize_log_table():
                 'message': 'MySQL服务不可用'
             }), 503
         
-        optimize_result = mysql_service.optimize_log_table()
-        return jsonify(optimize_result)
+        job = get_log_maintenance_service().manual_optimize()
+        return jsonify(job), 202
         
     except Exception as e:
         logger.error(f"优化日志表失败: {str(e)}")
@@ -378,6 +380,30 @@ def optimize_log_table():
             'message': str(e)
         }), 500
 
+@bp.route('/logs/jobs/<job_id>', methods=['GET'])
+@require_auth_api
+def get_log_job_status(job_id):
+    """查询日志清理/优化任务状态"""
+    try:
+        job = get_log_maintenance_service().get_job_status(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': '任务不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+        
+    except Exception as e:
+        logger.error(f"查询日志维护任务失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
 @bp.route('/status', methods=['GET'])
 @require_auth_api
 def system_status():
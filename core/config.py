@@ -121,6 +121,8 @@ class Config:
         self.UPLOAD_CONFIG = filesystem_config.upload
         self.DOWNLOAD_CONFIG = filesystem_config.download
         self.PREVIEW_CONFIG = filesystem_config.preview
+        self.FILE_IO_WORKERS = self.config_manager.get('filesystem.io_workers', 8)
+        self.FILE_INFO_DB_WRITE_ENABLED = self.config_manager.get('filesystem.file_info_db_write', True)
         
         # 性能配置
         performance_config = self.config_manager.get_performance_config()
@@ -193,7 +193,7 @@ def create_shared_files_table(cursor):
         owner_username VARCHAR(100) NOT NULL,
         shared_time DATETIME DEFAULT CURRENT_TIMESTAMP,
         is_active BOOLEAN DEFAULT TRUE,
-        INDEX idx_original_path (original_file_path(191)),
+        INDEX idx_shared_active (original_file_path(191), is_active),
         INDEX idx_shared_path (shared_file_path(191)),
         INDEX idx_owner (owner_username),
         INDEX idx_is_active (is_active),
@@ -213,6 +213,15 @@ def create_indexes(cursor):
         print("✅ 复合索引创建成功")
     except Exception as e:
         print(f"⚠️  复合索引创建失败（可能已存在）: {e}")
+    
+    try:
+        # 删除源文件时按(original_file_path, is_active)查找和停用共享记录
+        cursor.execute("""
+        CREATE INDEX idx_shared_active ON shared_files (original_file_path(191), is_active)
+        """)
+        print("✅ 共享文件复合索引创建成功")
+    except Exception as e:
+        print(f"⚠️  共享文件复合索引创建失败（可能已存在）: {e}")
 
 def insert_initial_data(cursor):
     """插入初始配置数据"""
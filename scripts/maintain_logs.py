@@ -83,7 +83,7 @@ def cleanup_logs(retention_days=30, force=False):
             return True
         
         # 执行清理
-        cleanup_result = mysql_service.cleanup_old_logs(retention_days)
+        cleanup_result = mysql_service.cleanup_old_logs(retention_days, count_remaining=True)
         
         if cleanup_result.get('success'):
             print("✅ 日志清理完成!")
@@ -5,18 +5,59 @@
 
 import os
 import time
-import hashlib
 import json
-from typing import Any, Optional, Union
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from typing import Any, List, Optional, Union
+from core.config import config
+from utils.file_utils import FileUtils
 from utils.logger import get_logger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = get_logger(__name__)
 
+# 路径索引的过期时间，需长于其登记的缓存键的最长TTL
+_PATH_INDEX_TTL = 900
+
+# Redis中的上级目录子树索引按时间分桶：每_PATH_INDEX_TTL秒换一个新集合，写入只进当前桶，
+# 清理时读取当前桶和上一个桶即可覆盖所有仍然有效的键。根目录等高层目录的集合每次命中都会
+# 被写入，不分桶时过期时间不断被刷新、集合只增不减；分桶后旧桶不再被写入，到期后自然删除
+_TREE_INDEX_BUCKETS_READ = 2
+
+# 进程内一级缓存（L1）：容量上限及Redis可用时的最长有效期。
+# 有效期较短是为了限制其他进程修改后本进程读到旧数据的时间。
+_L1_MAX_ENTRIES = 1024
+_L1_TTL = 60
+
+def _json_default(obj):
+    """标准库json的回退序列化：datetime按ISO格式输出，与orjson一致"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def _serialize(value: Any) -> Union[str, bytes]:
+    """序列化写入Redis的值，安装了orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
 class CacheService:
     """缓存服务类"""
     
     def __init__(self):
-        self.memory_cache = {}
+        # 进程内LRU缓存，位于Redis之前
+        self.memory_cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        # 路径索引：索引名 -> 缓存键集合，跨用户记录某路径下有哪些缓存
+        self.path_index = {}
+        self.fs_root = os.path.abspath(config.FILESYSTEM_ROOT)
         self.redis_service = None
         self._init_redis()
     
@@ -31,7 +72,7 @@ class CacheService:
                 logger.warning("Redis服务不可用，将使用内存缓存")
                 self.redis_service = None
         except Exception as e:
-            logger.warning(f"Redis服务初始化失败: {e}")
+            logger.warning("Redis服务初始化失败: %s", e)
             self.redis_service = None
     
     def _get_cache_ttl(self, key: str, data_type: str = None, data_size: int = None) -> int:
@@ -64,35 +105,54 @@ class CacheService:
         """生成缓存键"""
         key_parts = [prefix] + [str(arg) for arg in args]
         key_string = ':'.join(key_parts)
-        return hashlib.md5(key_string.encode()).hexdigest()[:16]
+        return FileUtils.path_digest(key_string)
+    
+    def _memory_put(self, key: str, value: Any, ttl: int) -> None:
+        """写入进程内缓存，超出容量时淘汰最久未使用的条目"""
+        now = time.time()
+        memory_cache = self.memory_cache
+        with self._memory_lock:
+            memory_cache[key] = {
+                'value': value,
+                'expires_at': now + ttl,
+                'created_at': now
+            }
+            memory_cache.move_to_end(key)
+            while len(memory_cache) > _L1_MAX_ENTRIES:
+                memory_cache.popitem(last=False)
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取缓存值"""
         try:
             # 1. 先检查内存缓存
-            if key in self.memory_cache:
-                item = self.memory_cache[key]
-                if time.time() < item['expires_at']:
-                    logger.debug(f"从内存缓存获取: {key}")
-                    return item['value']
-                else:
-                    # 清理过期缓存
-                    del self.memory_cache[key]
+            with self._memory_lock:
+                item = self.memory_cache.get(key)
+                if item is not None:
+                    if time.time() < item['expires_at']:
+                        self.memory_cache.move_to_end(key)
+                    else:
+                        # 清理过期缓存
+                        del self.memory_cache[key]
+                        item = None
+            if item is not None:
+                logger.debug("从内存缓存获取: %s", key)
+                return item['value']
             
-            # 2. 检查Redis缓存
+            # 2. 检查Redis缓存，命中后回填内存缓存
             if self.redis_service and self.redis_service.is_connected():
                 try:
                     value = self.redis_service.get(key)
                     if value:
-                        logger.debug(f"从Redis缓存获取: {key}")
+                        logger.debug("从Redis缓存获取: %s", key)
+                        self._memory_put(key, value, _L1_TTL)
                         return value
                 except Exception as e:
-                    logger.warning(f"Redis获取缓存失败: {e}")
+                    logger.warning("Redis获取缓存失败: %s", e)
             
             return default
             
         except Exception as e:
-            logger.error(f"获取缓存失败: {key}, 错误: {e}")
+            logger.error("获取缓存失败: %s, 错误: %s", key, e)
             return default
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None, 
@@ -103,53 +163,50 @@ class CacheService:
             if ttl is None:
                 ttl = self._get_cache_ttl(key, data_type, data_size)
             
-            # 1. 设置内存缓存
-            expires_at = time.time() + ttl
-            self.memory_cache[key] = {
-                'value': value,
-                'expires_at': expires_at,
-                'created_at': time.time()
-            }
+            redis_available = self.redis_service and self.redis_service.is_connected()
+            
+            # 1. 设置内存缓存（有Redis时只作为短期L1）
+            self._memory_put(key, value, min(ttl, _L1_TTL) if redis_available else ttl)
             
             # 2. 设置Redis缓存
-            if self.redis_service and self.redis_service.is_connected():
+            if redis_available:
                 try:
                     # 序列化数据
                     if isinstance(value, (dict, list)):
-                        serialized_value = json.dumps(value, ensure_ascii=False)
+                        serialized_value = _serialize(value)
                     else:
                         serialized_value = str(value)
                     
                     self.redis_service.set(key, serialized_value, ex=ttl)
-                    logger.debug(f"缓存已设置: {key}, TTL: {ttl}s")
+                    logger.debug("缓存已设置: %s, TTL: %ss", key, ttl)
                 except Exception as e:
-                    logger.warning(f"Redis设置缓存失败: {e}")
+                    logger.warning("Redis设置缓存失败: %s", e)
             
             return True
             
         except Exception as e:
-            logger.error(f"设置缓存失败: {key}, 错误: {e}")
+            logger.error("设置缓存失败: %s, 错误: %s", key, e)
             return False
     
     def delete(self, key: str) -> bool:
         """删除缓存"""
         try:
             # 删除内存缓存
-            if key in self.memory_cache:
-                del self.memory_cache[key]
+            with self._memory_lock:
+                self.memory_cache.pop(key, None)
             
             # 删除Redis缓存
             if self.redis_service and self.redis_service.is_connected():
                 try:
-                    self.redis_service.delete(key)
+                    self.redis_service.unlink(key)
                 except Exception as e:
-                    logger.warning(f"Redis删除缓存失败: {e}")
+                    logger.warning("Redis删除缓存失败: %s", e)
             
-            logger.debug(f"缓存已删除: {key}")
+            logger.debug("缓存已删除: %s", key)
             return True
             
         except Exception as e:
-            logger.error(f"删除缓存失败: {key}, 错误: {e}")
+            logger.error("删除缓存失败: %s, 错误: %s", key, e)
             return False
     
     def clear_pattern(self, pattern: str) -> int:
@@ -169,33 +226,146 @@ class CacheService:
                 regex = None
             
             # 清除内存缓存
-            if regex:
-                keys_to_delete = [k for k in self.memory_cache.keys() if regex.match(k)]
-            else:
-                keys_to_delete = [k for k in self.memory_cache.keys() if pattern in k]
-            
-            for key in keys_to_delete:
-                del self.memory_cache[key]
-                cleared_count += 1
+            with self._memory_lock:
+                if regex:
+                    keys_to_delete = [k for k in self.memory_cache.keys() if regex.match(k)]
+                else:
+                    keys_to_delete = [k for k in self.memory_cache.keys() if pattern in k]
+                
+                for key in keys_to_delete:
+                    del self.memory_cache[key]
+                    cleared_count += 1
             
-            # 清除Redis缓存
+            # 清除Redis缓存（SCAN分批删除，不阻塞Redis）
             if self.redis_service and self.redis_service.is_connected():
                 try:
-                    # 获取匹配的键
-                    keys = self.redis_service.keys(pattern)
-                    if keys:
-                        self.redis_service.delete(*keys)
-                        cleared_count += len(keys)
+                    cleared_count += self.redis_service.delete_pattern(pattern)
                 except Exception as e:
-                    logger.warning(f"Redis清除模式缓存失败: {e}")
+                    logger.warning("Redis清除模式缓存失败: %s", e)
             
-            logger.info(f"清除模式缓存完成: {pattern}, 共清除 {cleared_count} 个")
+            logger.info("清除模式缓存完成: %s, 共清除 %s 个", pattern, cleared_count)
             return cleared_count
             
         except Exception as e:
-            logger.error(f"清除模式缓存失败: {pattern}, 错误: {e}")
+            logger.error("清除模式缓存失败: %s, 错误: %s", pattern, e)
             return cleared_count
     
+    @staticmethod
+    def _path_index_name(kind: str, path: str) -> str:
+        """路径索引名：own记录路径自身的缓存键，tree记录其下级路径的缓存键"""
+        return f"path_index:{kind}:{FileUtils.path_digest(path)}"
+    
+    @staticmethod
+    def _tree_index_bucket(now: float) -> int:
+        """子树索引的当前时间桶编号"""
+        return int(now // _PATH_INDEX_TTL)
+    
+    def _path_ancestors(self, path: str) -> List[str]:
+        """路径的各级上级目录（不含自身），止于文件系统根目录"""
+        root = self.fs_root
+        prefix = root.rstrip(os.sep) + os.sep
+        ancestors = []
+        parent = os.path.dirname(path)
+        while parent != path and (parent == root or parent.startswith(prefix)):
+            ancestors.append(parent)
+            path, parent = parent, os.path.dirname(parent)
+        return ancestors
+    
+    def _prune_path_index(self) -> None:
+        """路径索引中只保留仍在内存缓存中的键（调用方需持有_memory_lock）"""
+        memory_cache = self.memory_cache
+        for name in list(self.path_index):
+            live_keys = {k for k in self.path_index[name] if k in memory_cache}
+            if live_keys:
+                self.path_index[name] = live_keys
+            else:
+                del self.path_index[name]
+    
+    def track_path(self, path: str, key: str) -> None:
+        """登记缓存键所属的路径，供invalidate_path按路径精确清理
+        
+        键同时登记到路径自身的索引和各级上级目录的子树索引中，
+        这样目录被删除或重命名时，其下所有路径的缓存也能一并清理。
+        """
+        try:
+            path = os.path.abspath(path)
+            own_name = self._path_index_name('own', path)
+            tree_names = [self._path_index_name('tree', p) for p in self._path_ancestors(path)]
+            names = [own_name, *tree_names]
+            
+            with self._memory_lock:
+                # 内存缓存有容量上限，被淘汰的键会残留在索引中，索引过大时清理一次
+                if len(self.path_index) > 4 * _L1_MAX_ENTRIES:
+                    self._prune_path_index()
+                for name in names:
+                    self.path_index.setdefault(name, set()).add(key)
+            
+            if self.redis_service and self.redis_service.is_connected():
+                try:
+                    client = self.redis_service.get_client()
+                    if client is not None:
+                        pipe = client.pipeline(transaction=False)
+                        pipe.sadd(own_name, key)
+                        pipe.expire(own_name, _PATH_INDEX_TTL)
+                        # 子树索引写入当前时间桶；桶在写入窗口结束后再保留一个窗口供清理读取
+                        bucket = self._tree_index_bucket(time.time())
+                        for name in tree_names:
+                            bucket_name = f"{name}:{bucket}"
+                            pipe.sadd(bucket_name, key)
+                            pipe.expire(bucket_name, _PATH_INDEX_TTL * _TREE_INDEX_BUCKETS_READ)
+                        pipe.execute()
+                except Exception as e:
+                    logger.warning("Redis登记路径索引失败: %s", e)
+        except Exception as e:
+            logger.error("登记路径索引失败: %s, 错误: %s", path, e)
+    
+    def invalidate_path(self, path: str, subtree: bool = True) -> int:
+        """清理某路径下登记过的全部缓存（所有用户）
+        
+        subtree为True时同时清理其下级路径的缓存，返回清理的键数量。
+        """
+        try:
+            path = os.path.abspath(path)
+            names = [self._path_index_name('own', path)]
+            if subtree:
+                names.append(self._path_index_name('tree', path))
+            
+            # Redis中的子树索引分桶存储，读取仍可能含有效键的最近几个桶
+            redis_names = [names[0]]
+            if subtree:
+                bucket = self._tree_index_bucket(time.time())
+                redis_names.extend(f"{names[1]}:{bucket - i}" for i in range(_TREE_INDEX_BUCKETS_READ))
+            
+            keys = set()
+            with self._memory_lock:
+                for name in names:
+                    keys |= self.path_index.pop(name, set())
+            
+            if self.redis_service and self.redis_service.is_connected():
+                try:
+                    client = self.redis_service.get_client()
+                    if client is not None:
+                        pipe = client.pipeline(transaction=False)
+                        for name in redis_names:
+                            pipe.smembers(name)
+                        for members in pipe.execute():
+                            keys.update(members)
+                        self.redis_service.unlink(*redis_names, *keys)
+                except Exception as e:
+                    logger.warning("Redis按路径清理缓存失败: %s", e)
+            
+            memory_cache = self.memory_cache
+            with self._memory_lock:
+                for key in keys:
+                    memory_cache.pop(key, None)
+            
+            logger.debug("按路径清理缓存: %s, 共 %s 个键", path, len(keys))
+            return len(keys)
+            
+        except Exception as e:
+            logger.error("按路径清理缓存失败: %s, 错误: %s", path, e)
+            return 0
+    
     def get_stats(self) -> dict:
         """获取缓存统计信息"""
         try:
@@ -214,8 +384,9 @@ class CacheService:
             
             # 统计过期键
             current_time = time.time()
-            expired_keys = [k for k, v in self.memory_cache.items() 
-                          if current_time >= v['expires_at']]
+            with self._memory_lock:
+                expired_keys = [k for k, v in self.memory_cache.items() 
+                              if current_time >= v['expires_at']]
             stats['memory_cache']['expired_keys'] = len(expired_keys)
             
             # Redis统计
@@ -229,24 +400,27 @@ class CacheService:
             return stats
             
         except Exception as e:
-            logger.error(f"获取缓存统计失败: {e}")
+            logger.error("获取缓存统计失败: %s", e)
             return {}
     
     def cleanup_expired(self) -> int:
         """清理过期缓存"""
         try:
             current_time = time.time()
-            expired_keys = [k for k, v in self.memory_cache.items() 
-                          if current_time >= v['expires_at']]
-            
-            for key in expired_keys:
-                del self.memory_cache[key]
+            with self._memory_lock:
+                expired_keys = [k for k, v in self.memory_cache.items() 
+                              if current_time >= v['expires_at']]
+                
+                for key in expired_keys:
+                    del self.memory_cache[key]
+                
+                self._prune_path_index()
             
-            logger.info(f"清理过期缓存完成，共清理 {len(expired_keys)} 个")
+            logger.info("清理过期缓存完成，共清理 %s 个", len(expired_keys))
             return len(expired_keys)
             
         except Exception as e:
-            logger.error(f"清理过期缓存失败: {e}")
+            logger.error("清理过期缓存失败: %s", e)
             return 0
     
     def _get_redis_service(self):
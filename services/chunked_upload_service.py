@@ -7,7 +7,6 @@ import os
 import hashlib
 import time
 import json
-import shutil
 import mmap
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
@@ -15,9 +14,10 @@ from pathlib import Path
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from core.config import Config
+from core.config import config
 from services.mysql_service import get_mysql_service
 from services.cache_service import get_cache_service
+from services.file_service import invalidate_listing_cache
 from utils.logger import get_logger
 from utils.file_utils import FileUtils
 
@@ -27,7 +27,7 @@ class ChunkedUploadService:
     """分块上传服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.mysql_service = None
         self.cache_service = get_cache_service()
         
@@ -48,34 +48,24 @@ class ChunkedUploadService:
             else:
                 logger.warning("MySQL服务不可用，将跳过数据库日志记录")
         except Exception as e:
-            logger.warning(f"MySQL服务初始化失败: {e}")
+            logger.warning("MySQL服务初始化失败: %s", e)
     
     def _invalidate_cache(self, file_path: str, current_user: Dict[str, Any] = None) -> None:
-        """清理相关缓存"""
+        """清理相关缓存：文件自身及其父目录在所有用户下的缓存"""
         try:
-            import hashlib
-            
-            # 获取用户ID
-            user_id = current_user['user_id'] if current_user else 'anonymous'
-            
-            # 清理文件信息缓存
-            file_cache_key = f"file_info:{user_id}:{hashlib.md5(file_path.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(file_cache_key)
-            logger.debug(f"清理文件信息缓存: {file_path} -> {file_cache_key}")
-            
-            # 清理父目录的目录列表缓存
             parent_dir = os.path.dirname(file_path) if file_path != '.' else '.'
-            dir_cache_key = f"dir_listing:{user_id}:{hashlib.md5(parent_dir.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(dir_cache_key)
-            logger.debug(f"清理父目录缓存: {parent_dir} -> {dir_cache_key}")
+            if parent_dir == "":
+                parent_dir = "."
             
-            # 清理所有相关的目录列表缓存（使用模式匹配）
-            pattern = "dir_listing:*"
-            cleared_count = self.cache_service.clear_pattern(pattern)
-            logger.info(f"清理目录列表缓存模式: {pattern}, 清理了 {cleared_count} 个键")
+            # 进程内目录列表缓存（覆盖写入同名文件时目录mtime不变）
+            invalidate_listing_cache(file_path)
+            
+            cleared_count = self.cache_service.invalidate_path(file_path)
+            cleared_count += self.cache_service.invalidate_path(parent_dir, subtree=False)
+            logger.debug("清理缓存: %s, 清理了 %s 个键", file_path, cleared_count)
             
         except Exception as e:
-            logger.error(f"清理缓存失败: {file_path}, 错误: {e}")
+            logger.error("清理缓存失败: %s, 错误: %s", file_path, e)
     
     def _generate_upload_id(self, filename: str, file_size: int, user_id: str) -> str:
         """生成唯一的上传ID"""
@@ -105,7 +95,7 @@ class ChunkedUploadService:
                 with open(info_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except Exception as e:
-                logger.error(f"加载上传信息失败: {e}")
+                logger.error("加载上传信息失败: %s", e)
         return None
     
     def _cleanup_upload(self, upload_id: str):
@@ -124,9 +114,9 @@ class ChunkedUploadService:
             if os.path.exists(info_path):
                 os.remove(info_path)
                 
-            logger.info(f"清理上传 {upload_id} 的临时文件完成")
+            logger.info("清理上传 %s 的临时文件完成", upload_id)
         except Exception as e:
-            logger.error(f"清理上传 {upload_id} 临时文件失败: {e}")
+            logger.error("清理上传 %s 临时文件失败: %s", upload_id, e)
     
     def _cleanup_expired_uploads(self):
         """清理过期的上传"""
@@ -144,11 +134,11 @@ class ChunkedUploadService:
                         # 检查是否过期
                         if current_time - upload_info.get('created_at', 0) > self.upload_timeout:
                             self._cleanup_upload(upload_id)
-                            logger.info(f"清理过期上传: {upload_id}")
+                            logger.info("清理过期上传: %s", upload_id)
                     except Exception as e:
-                        logger.error(f"处理过期上传 {upload_id} 失败: {e}")
+                        logger.error("处理过期上传 %s 失败: %s", upload_id, e)
         except Exception as e:
-            logger.error(f"清理过期上传失败: {e}")
+            logger.error("清理过期上传失败: %s", e)
     
     def _merge_chunks_optimized(self, upload_info: Dict[str, Any], target_path: str):
         """优化的文件块合并方法"""
@@ -164,7 +154,7 @@ class ChunkedUploadService:
                 self._merge_chunks_standard(upload_info, target_path)
                 
         except Exception as e:
-            logger.error(f"优化合并失败，回退到标准方法: {e}")
+            logger.error("优化合并失败，回退到标准方法: %s", e)
             self._merge_chunks_standard(upload_info, target_path)
     
     def _merge_chunks_with_mmap(self, upload_info: Dict[str, Any], target_path: str):
@@ -191,23 +181,25 @@ class ChunkedUploadService:
                     # 每合并5个块输出一次进度
                     if (i + 1) % 5 == 0 or i == total_chunks - 1:
                         progress = (i + 1) / total_chunks * 100
-                        logger.info(f"合并进度: {progress:.1f}% ({i+1}/{total_chunks} 块)")
+                        logger.info("合并进度: %.1f%% (%s/%s 块)", progress, i+1, total_chunks)
     
     def _merge_chunks_standard(self, upload_info: Dict[str, Any], target_path: str):
         """标准文件块合并方法（优化版）"""
         total_chunks = upload_info['total_chunks']
         
-        with open(target_path, 'wb', buffering=2*1024*1024) as output_file:  # 2MB缓冲区
+        with open(target_path, 'wb') as output_file:
+            out_fd = output_file.fileno()
+            offset = 0
             for i in range(total_chunks):
                 chunk_path = self._get_chunk_path(upload_info['upload_id'], i)
                 
-                with open(chunk_path, 'rb', buffering=2*1024*1024) as chunk_file:  # 2MB缓冲区
-                    shutil.copyfileobj(chunk_file, output_file, length=2*1024*1024)  # 2MB块大小
+                # 块数据在内核中直接追加到目标文件，不经过用户态缓冲区
+                offset += FileUtils.copy_file_into(chunk_path, out_fd, offset)
                 
                 # 每合并5个块输出一次进度
                 if (i + 1) % 5 == 0 or i == total_chunks - 1:
                     progress = (i + 1) / total_chunks * 100
-                    logger.info(f"合并进度: {progress:.1f}% ({i+1}/{total_chunks} 块)")
+                    logger.info("合并进度: %.1f%% (%s/%s 块)", progress, i+1, total_chunks)
     
     def initialize_upload(self, filename: str, file_size: int, user_id: str, 
                          target_directory: str = '.', chunk_size: int = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -255,7 +247,7 @@ class ChunkedUploadService:
             # 保存上传信息
             self._save_upload_info(upload_id, upload_info)
             
-            logger.info(f"初始化分块上传: {filename} ({file_size} bytes, {total_chunks} 块)")
+            logger.info("初始化分块上传: %s (%s bytes, %s 块)", filename, file_size, total_chunks)
             
             return {
                 'success': True,
@@ -266,7 +258,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"初始化分块上传失败: {e}")
+            logger.error("初始化分块上传失败: %s", e)
             return {
                 'success': False,
                 'message': f'初始化分块上传失败: {str(e)}'
@@ -314,16 +306,16 @@ class ChunkedUploadService:
             
             # 保存块文件
             chunk_path = self._get_chunk_path(upload_id, chunk_index)
-            logger.info(f"保存块文件: {chunk_path}, 大小: {len(chunk_data)} 字节")
+            logger.info("保存块文件: %s, 大小: %s 字节", chunk_path, len(chunk_data))
             with open(chunk_path, 'wb') as f:
                 f.write(chunk_data)
-            logger.info(f"块文件保存成功: {chunk_path}")
+            logger.info("块文件保存成功: %s", chunk_path)
             
             # 更新上传信息
             if chunk_index not in upload_info['uploaded_chunks']:
                 upload_info['uploaded_chunks'].append(chunk_index)
                 upload_info['uploaded_chunks'].sort()
-                logger.info(f"块 {chunk_index} 已添加到已上传列表: {upload_info['uploaded_chunks']}")
+                logger.info("块 %s 已添加到已上传列表: %s", chunk_index, upload_info['uploaded_chunks'])
             
             upload_info['updated_at'] = time.time()
             self._save_upload_info(upload_id, upload_info)
@@ -347,7 +339,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"上传块失败: {e}")
+            logger.error("上传块失败: %s", e)
             return {
                 'success': False,
                 'message': f'上传块失败: {str(e)}'
@@ -378,7 +370,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"获取上传状态失败: {e}")
+            logger.error("获取上传状态失败: %s", e)
             return {
                 'success': False,
                 'message': f'获取上传状态失败: {str(e)}'
@@ -391,7 +383,7 @@ class ChunkedUploadService:
                 # 检查是否已经在合并中
                 upload_info = self._load_upload_info(upload_id)
                 if upload_info and upload_info.get('status') == 'merging':
-                    logger.info(f"上传 {upload_id} 已在合并中，跳过异步合并")
+                    logger.info("上传 %s 已在合并中，跳过异步合并", upload_id)
                     return
                 
                 # 设置合并状态
@@ -406,9 +398,9 @@ class ChunkedUploadService:
                     if upload_info:
                         upload_info['status'] = 'completed'
                         self._save_upload_info(upload_id, upload_info)
-                        logger.error(f"异步合并失败，重置状态为completed: {upload_id}")
+                        logger.error("异步合并失败，重置状态为completed: %s", upload_id)
             except Exception as e:
-                logger.error(f"异步合并文件失败: {e}")
+                logger.error("异步合并文件失败: %s", e)
                 # 如果异步合并失败，重置状态为completed
                 try:
                     upload_info = self._load_upload_info(upload_id)
@@ -442,7 +434,7 @@ class ChunkedUploadService:
             
             # 检查是否已经在合并中
             if upload_info.get('status') == 'merging':
-                logger.info(f"上传 {upload_id} 已在合并中，等待完成...")
+                logger.info("上传 %s 已在合并中，等待完成...", upload_id)
                 # 等待异步合并完成，最多等待10秒
                 max_wait_time = 10
                 wait_interval = 0.5
@@ -461,7 +453,7 @@ class ChunkedUploadService:
                         }
                     elif upload_info.get('status') == 'completed':
                         # 如果状态回到completed，说明异步合并失败了，我们手动合并
-                        logger.info(f"异步合并失败，开始手动合并: {upload_id}")
+                        logger.info("异步合并失败，开始手动合并: %s", upload_id)
                         break
                 
                 if waited_time >= max_wait_time:
@@ -476,8 +468,8 @@ class ChunkedUploadService:
             
             # 检查所有块是否都存在
             missing_chunks = []
-            logger.info(f"开始检查块文件，上传ID: {upload_id}, 总块数: {upload_info['total_chunks']}")
-            logger.info(f"已上传块列表: {upload_info['uploaded_chunks']}")
+            logger.info("开始检查块文件，上传ID: %s, 总块数: %s", upload_id, upload_info['total_chunks'])
+            logger.info("已上传块列表: %s", upload_info['uploaded_chunks'])
             
             # 如果已上传块列表为空，重新扫描块文件
             if not upload_info['uploaded_chunks']:
@@ -488,19 +480,19 @@ class ChunkedUploadService:
                     if os.path.exists(chunk_path):
                         actual_uploaded.append(i)
                 
-                logger.info(f"重新扫描到的块: {actual_uploaded}")
+                logger.info("重新扫描到的块: %s", actual_uploaded)
                 upload_info['uploaded_chunks'] = actual_uploaded
                 self._save_upload_info(upload_id, upload_info)
             
             for i in range(upload_info['total_chunks']):
                 chunk_path = self._get_chunk_path(upload_id, i)
                 exists = os.path.exists(chunk_path)
-                logger.info(f"检查块 {i}: {chunk_path}, 存在: {exists}")
+                logger.info("检查块 %s: %s, 存在: %s", i, chunk_path, exists)
                 if not exists:
                     missing_chunks.append(i)
             
             if missing_chunks:
-                logger.error(f"缺少块文件: {missing_chunks}")
+                logger.error("缺少块文件: %s", missing_chunks)
                 return {
                     'success': False,
                     'message': f'缺少块: {missing_chunks}'
@@ -525,7 +517,7 @@ class ChunkedUploadService:
             
             # 合并文件块
             start_time = time.time()
-            logger.info(f"开始合并文件块: {upload_info['total_chunks']} 个块")
+            logger.info("开始合并文件块: %s 个块", upload_info['total_chunks'])
             
             # 使用优化的合并方法
             self._merge_chunks_optimized(upload_info, target_path)
@@ -534,14 +526,14 @@ class ChunkedUploadService:
             actual_size = os.path.getsize(target_path)
             expected_size = upload_info['file_size']
             if actual_size != expected_size:
-                logger.error(f"文件大小不匹配: 期望 {expected_size}, 实际 {actual_size}")
+                logger.error("文件大小不匹配: 期望 %s, 实际 %s", expected_size, actual_size)
                 os.remove(target_path)
                 return {
                     'success': False,
                     'message': f'文件大小不匹配: 期望 {expected_size}, 实际 {actual_size}'
                 }
             
-            logger.info(f"文件大小验证通过: {actual_size} 字节")
+            logger.info("文件大小验证通过: %s 字节", actual_size)
             
             # 获取文件信息
             file_info = FileUtils.get_file_info(target_path)
@@ -553,7 +545,7 @@ class ChunkedUploadService:
                         self.mysql_service.save_file_info(file_info)
                         logger.info("文件信息已保存到数据库")
                 except Exception as e:
-                    logger.error(f"保存文件信息到数据库失败: {e}")
+                    logger.error("保存文件信息到数据库失败: %s", e)
             
             def log_operation():
                 try:
@@ -569,9 +561,9 @@ class ChunkedUploadService:
                             status='success',
                             duration_ms=duration_ms
                         )
-                        logger.info(f"操作日志已记录，耗时: {duration_ms}ms")
+                        logger.info("操作日志已记录，耗时: %sms", duration_ms)
                 except Exception as e:
-                    logger.error(f"记录操作日志失败: {e}")
+                    logger.error("记录操作日志失败: %s", e)
             
             # 异步执行数据库操作
             with ThreadPoolExecutor(max_workers=2) as executor:
@@ -592,7 +584,7 @@ class ChunkedUploadService:
             upload_info['merged_at'] = time.time()
             self._save_upload_info(upload_id, upload_info)
             
-            logger.info(f"文件合并成功: {target_path} ({file_info['size']} bytes)")
+            logger.info("文件合并成功: %s (%s bytes)", target_path, file_info['size'])
             
             return {
                 'success': True,
@@ -602,7 +594,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"合并文件失败: {e}")
+            logger.error("合并文件失败: %s", e)
             return {
                 'success': False,
                 'message': f'合并文件失败: {str(e)}'
@@ -621,7 +613,7 @@ class ChunkedUploadService:
             # 清理临时文件
             self._cleanup_upload(upload_id)
             
-            logger.info(f"取消上传: {upload_id}")
+            logger.info("取消上传: %s", upload_id)
             
             return {
                 'success': True,
@@ -629,7 +621,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"取消上传失败: {e}")
+            logger.error("取消上传失败: %s", e)
             return {
                 'success': False,
                 'message': f'取消上传失败: {str(e)}'
@@ -665,7 +657,7 @@ class ChunkedUploadService:
                             'updated_at': upload_info['updated_at']
                         })
                     except Exception as e:
-                        logger.error(f"处理上传信息 {upload_id} 失败: {e}")
+                        logger.error("处理上传信息 %s 失败: %s", upload_id, e)
             
             return {
                 'success': True,
@@ -674,7 +666,7 @@ class ChunkedUploadService:
             }
             
         except Exception as e:
-            logger.error(f"获取上传列表失败: {e}")
+            logger.error("获取上传列表失败: %s", e)
             return {
                 'success': False,
                 'message': f'获取上传列表失败: {str(e)}'
@@ -4,14 +4,17 @@
 """
 
 import os
+import stat
 import time
 import requests
 from typing import Dict, Any, Optional, Tuple
 from flask import send_file, Response, request
 from urllib.parse import urlparse
 import re
+from datetime import datetime
+from operator import itemgetter
 
-from core.config import Config
+from core.config import config
 from services.mysql_service import get_mysql_service
 from utils.logger import get_logger
 from utils.file_utils import FileUtils
@@ -22,7 +25,7 @@ class DownloadService:
     """文件下载服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.mysql_service = None
         
         # 尝试初始化MySQL服务
@@ -33,7 +36,7 @@ class DownloadService:
             else:
                 logger.warning("MySQL服务不可用，将跳过数据库日志记录")
         except Exception as e:
-            logger.warning(f"MySQL服务初始化失败: {e}")
+            logger.warning("MySQL服务初始化失败: %s", e)
         
         # 确保download目录存在
         self.download_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'download')
@@ -61,7 +64,7 @@ class DownloadService:
                 duration_ms=duration_ms
             )
         except Exception as e:
-            logger.error(f"记录操作日志失败: {e}")
+            logger.error("记录操作日志失败: %s", e)
     
     def download_file(self, file_path: str, user_ip: str = None, user_agent: str = None) -> Response:
         """下载文件（支持HTTP Range请求）"""
@@ -73,15 +76,16 @@ class DownloadService:
                 raise ValueError("文件路径不安全")
             
             # 检查文件是否存在
-            if not os.path.exists(file_path):
+            st = FileUtils.stat_or_none(file_path)
+            if st is None:
                 raise FileNotFoundError("文件不存在")
             
             # 检查是否为文件
-            if not os.path.isfile(file_path):
+            if not stat.S_ISREG(st.st_mode):
                 raise ValueError("路径不是文件")
             
             # 获取文件信息
-            file_info = FileUtils.get_file_info(file_path)
+            file_info = FileUtils.get_file_info(file_path, st)
             file_size = file_info['size']
             
             # 检查是否支持Range请求
@@ -194,7 +198,7 @@ class DownloadService:
             return response
             
         except Exception as e:
-            logger.error(f"处理Range请求失败: {e}")
+            logger.error("处理Range请求失败: %s", e)
             # 如果Range请求处理失败，回退到完整文件下载
             return self._send_full_file(file_path, file_info, user_ip, user_agent)
     
@@ -224,15 +228,16 @@ class DownloadService:
                 raise ValueError("目录路径不安全")
             
             # 检查目录是否存在
-            if not os.path.exists(directory_path):
+            st = FileUtils.stat_or_none(directory_path)
+            if st is None:
                 raise FileNotFoundError("目录不存在")
             
             # 检查是否为目录
-            if not os.path.isdir(directory_path):
+            if not stat.S_ISDIR(st.st_mode):
                 raise ValueError("路径不是目录")
             
             # 获取目录信息
-            dir_info = FileUtils.get_file_info(directory_path)
+            dir_info = FileUtils.get_file_info(directory_path, st)
             
             # 创建临时ZIP文件
             import tempfile
@@ -298,7 +303,7 @@ class DownloadService:
             stats = self.mysql_service.get_operation_stats(days)
             return stats
         except Exception as e:
-            logger.error(f"获取下载统计失败: {e}")
+            logger.error("获取下载统计失败: %s", e)
             return {
                 'success': False,
                 'message': str(e)
@@ -369,7 +374,7 @@ class DownloadService:
                 }
             
             # 下载文件
-            logger.info(f"开始从 {url} 下载文件到 {local_file_path}")
+            logger.info("开始从 %s 下载文件到 %s", url, local_file_path)
             
             # 设置请求头，模拟浏览器行为
             headers = {
@@ -413,7 +418,7 @@ class DownloadService:
                 duration_ms=duration_ms
             )
             
-            logger.info(f"文件下载成功: {filename}, 大小: {actual_size} 字节")
+            logger.info("文件下载成功: %s, 大小: %s 字节", filename, actual_size)
             
             return {
                 'success': True,
@@ -463,20 +468,22 @@ class DownloadService:
                     'message': 'download目录不存在'
                 }
             
+            # scandir的条目自带类型和stat缓存，只需大小和修改时间，无需完整文件信息（含哈希）
             files = []
-            for filename in os.listdir(self.download_dir):
-                file_path = os.path.join(self.download_dir, filename)
-                if os.path.isfile(file_path):
-                    file_info = FileUtils.get_file_info(file_path)
+            with os.scandir(self.download_dir) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
                     files.append({
-                        'name': filename,
-                        'size': file_info['size'],
-                        'modified_time': file_info['modified_time'],
-                        'path': file_path
+                        'name': entry.name,
+                        'size': st.st_size,
+                        'modified_time': datetime.fromtimestamp(st.st_mtime),
+                        'path': entry.path
                     })
             
             # 按修改时间排序，最新的在前
-            files.sort(key=lambda x: x['modified_time'], reverse=True)
+            files.sort(key=itemgetter('modified_time'), reverse=True)
             
             return {
                 'success': True,
@@ -486,7 +493,7 @@ class DownloadService:
             }
             
         except Exception as e:
-            logger.error(f"获取下载文件列表失败: {e}")
+            logger.error("获取下载文件列表失败: %s", e)
             return {
                 'success': False,
                 'message': str(e)
@@ -497,20 +504,21 @@ class DownloadService:
         try:
             file_path = os.path.join(self.download_dir, filename)
             
-            if not os.path.exists(file_path):
+            st = FileUtils.stat_or_none(file_path)
+            if st is None:
                 return {
                     'success': False,
                     'message': '文件不存在'
                 }
             
-            if not os.path.isfile(file_path):
+            if not stat.S_ISREG(st.st_mode):
                 return {
                     'success': False,
                     'message': '路径不是文件'
                 }
             
             # 获取文件信息用于日志记录
-            file_info = FileUtils.get_file_info(file_path)
+            file_info = FileUtils.get_file_info(file_path, st)
             
             # 删除文件
             os.remove(file_path)
@@ -532,7 +540,7 @@ class DownloadService:
             }
             
         except Exception as e:
-            logger.error(f"删除下载文件失败: {e}")
+            logger.error("删除下载文件失败: %s", e)
             return {
                 'success': False,
                 'message': str(e)
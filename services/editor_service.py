@@ -4,11 +4,13 @@
 """
 
 import os
+import stat
 import mimetypes
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from utils.logger import get_logger
+from utils.file_utils import FileUtils
 
 class EditorService:
     """在线编辑器服务类"""
@@ -121,14 +123,15 @@ class EditorService:
                 if not os.path.abspath(abs_path).startswith(os.path.abspath(self.root_dir)):
                     raise ValueError("文件路径超出允许范围")
             
-            if not os.path.exists(abs_path):
+            st = FileUtils.stat_or_none(abs_path)
+            if st is None:
                 raise FileNotFoundError("文件不存在")
             
-            if not os.path.isfile(abs_path):
+            if not stat.S_ISREG(st.st_mode):
                 raise ValueError("指定路径不是文件")
             
             # 检查文件大小（限制为10MB）
-            file_size = os.path.getsize(abs_path)
+            file_size = st.st_size
             if file_size > 10 * 1024 * 1024:  # 10MB
                 raise ValueError("文件过大，无法编辑")
             
@@ -211,8 +214,7 @@ class EditorService:
             if os.path.exists(abs_path):
                 backup_path = f"{abs_path}.backup"
                 try:
-                    import shutil
-                    shutil.copy2(abs_path, backup_path)
+                    FileUtils.fast_copy(abs_path, backup_path)
                 except Exception as e:
                     self.logger.warning(f"创建备份失败: {str(e)}")
             
@@ -220,6 +222,10 @@ class EditorService:
             with open(abs_path, 'w', encoding='utf-8') as f:
                 f.write(content)
             
+            # 覆盖写入不改变目录mtime，需主动使目录列表缓存失效
+            from services.file_service import invalidate_listing_cache
+            invalidate_listing_cache(abs_path)
+            
             # 获取更新后的文件信息
             file_info = {
                 'success': True,
@@ -254,10 +260,11 @@ class EditorService:
                 else:
                     abs_path = os.path.join(self.root_dir, file_path)
             
-            if not os.path.exists(abs_path):
+            st = FileUtils.stat_or_none(abs_path)
+            if st is None:
                 raise FileNotFoundError("文件不存在")
             
-            if not os.path.isfile(abs_path):
+            if not stat.S_ISREG(st.st_mode):
                 raise ValueError("指定路径不是文件")
             
             # 读取前几行
@@ -301,10 +308,11 @@ class EditorService:
                 else:
                     abs_path = os.path.join(self.root_dir, file_path)
             
-            if not os.path.exists(abs_path):
+            st = FileUtils.stat_or_none(abs_path)
+            if st is None:
                 raise FileNotFoundError("文件不存在")
             
-            if not os.path.isfile(abs_path):
+            if not stat.S_ISREG(st.st_mode):
                 raise ValueError("指定路径不是文件")
             
             matches = []
@@ -4,192 +4,792 @@
 """
 
 import os
+import errno
+import stat
 import shutil
 import time
-import hashlib
+import uuid
+import asyncio
+import heapq
+import functools
+import threading
+import queue
+from collections import OrderedDict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
-from core.config import Config
+from core.config import config
 from services.cache_service import get_cache_service
 from services.mysql_service import get_mysql_service
+from services.security_service import get_security_service
 from utils.logger import get_logger
+from utils.batch_writer import BatchWriter
 from utils.file_utils import (
     FileUtils
 )
 
 logger = get_logger(__name__)
 
+
+# 缓存键中的路径摘要（16位十六进制），同一路径只计算一次
+_path_key = FileUtils.path_digest
+
+
+# 不存在路径的短期缓存，拦截对同一缺失路径的重复探测
+_MISSING_PATH_TTL = 1.0
+_MISSING_PATH_MAX = 4096
+_missing_paths: "OrderedDict[str, float]" = OrderedDict()
+_missing_paths_lock = threading.Lock()
+
+
+def _stat_or_none(path: str, use_missing_cache: bool = False,
+                  follow_symlinks: bool = True) -> Optional[os.stat_result]:
+    """一次stat获取路径状态，路径不存在时返回None
+    
+    use_missing_cache: 为True时，TTL内已确认不存在的路径直接返回None。
+    只应用于源路径检查；目标路径是否已存在必须实时检查，避免覆盖文件。
+    follow_symlinks: 为False时使用lstat，符号链接按链接自身判断类型
+    """
+    if use_missing_cache:
+        with _missing_paths_lock:
+            missing_at = _missing_paths.get(path)
+        if missing_at is not None and time.monotonic() - missing_at < _MISSING_PATH_TTL:
+            return None
+    
+    st = FileUtils.stat_or_none(path, follow_symlinks=follow_symlinks)
+    if st is None:
+        with _missing_paths_lock:
+            _missing_paths[path] = time.monotonic()
+            _missing_paths.move_to_end(path)
+            if len(_missing_paths) > _MISSING_PATH_MAX:
+                _missing_paths.popitem(last=False)
+    return st
+
+
+def _forget_missing(path: str) -> None:
+    """路径被创建后，从不存在路径缓存中移除"""
+    with _missing_paths_lock:
+        _missing_paths.pop(path, None)
+
+
+# 进程内目录列表缓存：键为目录绝对路径，目录mtime变化或超过TTL即失效。
+# 覆盖写入已有文件不会改变目录mtime，写文件的代码路径需调用invalidate_listing_cache，
+# 否则列表中该文件的大小和修改时间最多滞后_LISTING_CACHE_TTL秒
+_LISTING_CACHE_TTL = 5.0
+_LISTING_CACHE_MAX = 1024
+_listing_cache: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+_listing_cache_lock = threading.Lock()
+
+
+def _get_cached_listing(path: str, dir_st: Optional[os.stat_result]) -> Optional[Dict[str, Any]]:
+    """返回仍然有效的目录列表缓存（浅拷贝），否则返回None"""
+    if dir_st is None:
+        return None
+    key = os.path.abspath(path)
+    with _listing_cache_lock:
+        cached = _listing_cache.get(key)
+        if cached is None:
+            return None
+        mtime_ns, expires_at, result = cached
+        if mtime_ns != dir_st.st_mtime_ns or expires_at < time.monotonic():
+            del _listing_cache[key]
+            return None
+        _listing_cache.move_to_end(key)
+    return dict(result)
+
+
+def _put_cached_listing(path: str, dir_st: Optional[os.stat_result], result: Dict[str, Any]) -> None:
+    """缓存目录列表，记录生成时目录的mtime"""
+    if dir_st is None:
+        return
+    key = os.path.abspath(path)
+    with _listing_cache_lock:
+        _listing_cache[key] = (dir_st.st_mtime_ns, time.monotonic() + _LISTING_CACHE_TTL, result)
+        _listing_cache.move_to_end(key)
+        while len(_listing_cache) > _LISTING_CACHE_MAX:
+            _listing_cache.popitem(last=False)
+
+
+def _invalidate_listing(*paths: str) -> None:
+    """使指定目录的进程内列表缓存失效"""
+    with _listing_cache_lock:
+        for path in paths:
+            _listing_cache.pop(os.path.abspath(path or '.'), None)
+
+
+def invalidate_listing_cache(file_path: str) -> None:
+    """文件内容被写入后调用：使其所在目录（及路径本身，若为目录）的进程内列表缓存失效"""
+    file_path = os.path.abspath(file_path)
+    _invalidate_listing(file_path, os.path.dirname(file_path))
+
+
+def _sorted_by_name(keyed_items: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """按预先计算的(casefold名称, 条目)排序并返回条目列表"""
+    keyed_items.sort(key=itemgetter(0))
+    return [item for _, item in keyed_items]
+
+
+def _paginate_listing(listing: Dict[str, Any], offset: int, limit: Optional[int]) -> Dict[str, Any]:
+    """从完整的目录列表中截取一页，统计字段保持为整个目录的值"""
+    if limit is None:
+        return listing
+    return dict(listing, items=listing['items'][offset:offset + limit], offset=offset, limit=limit)
+
+
+def _scan_listing_page(path: str, offset: int, limit: int) -> Dict[str, Any]:
+    """扫描目录并只为排序后[offset, offset+limit)范围内的条目构建文件信息
+    
+    扫描时只保留(排序键, DirEntry)，由heapq.nsmallest选出前offset+limit个，
+    页外条目不创建字典、不计算哈希；目录和文件数量、总大小在同一次扫描中统计。
+    """
+    dir_count = file_count = total_size = 0
+    
+    def keyed_entries(it):
+        nonlocal dir_count, file_count, total_size
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    dir_count += 1
+                    yield (0, entry.name.casefold()), entry
+                else:
+                    size = entry.stat().st_size
+                    file_count += 1
+                    total_size += size
+                    yield (1, entry.name.casefold()), entry
+            except OSError:
+                continue
+    
+    try:
+        with os.scandir(path) as it:
+            selected = heapq.nsmallest(offset + limit, keyed_entries(it), key=itemgetter(0))
+    except PermissionError:
+        raise PermissionError("目录访问被拒绝")
+    
+    get_info = FileUtils.get_file_info_from_entry
+    items = []
+    for _, entry in selected[offset:]:
+        item_info = get_info(entry, True)
+        if item_info:
+            items.append(item_info)
+    
+    return {
+        'path': path,
+        'items': items,
+        'total_items': dir_count + file_count,
+        'file_count': file_count,
+        'dir_count': dir_count,
+        'total_size': total_size,
+        'formatted_size': FileUtils.format_file_size(total_size),
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def _walk_fast(root: str, follow_symlinks: bool = False, ignore_errors: bool = False):
+    """自顶向下遍历目录树，逐目录产出 (dirpath, [DirEntry, ...])
+    
+    与os.walk不同，不对每个条目额外调用stat判断类型，
+    DirEntry自带的类型和stat缓存可直接被调用方复用。
+    父目录总是先于其子目录产出。
+    ignore_errors: 为True时跳过无法读取的目录（与os.walk默认行为一致）
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            if not ignore_errors:
+                raise
+            continue
+        yield current, entries
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                stack.append(entry.path)
+
+
+def _match_entries(entries, query_folded: str,
+                   matched_dirs: List[Tuple[str, Dict[str, Any]]],
+                   matched_files: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """将名称匹配查询的条目按目录/文件分别收集为(casefold名称, 文件信息)
+    
+    每个名称只casefold一次，结果同时用于匹配和排序
+    """
+    # 循环内反复使用的函数绑定为局部变量，省去每次的属性查找
+    get_info = FileUtils.get_file_info_from_entry
+    add_dir = matched_dirs.append
+    add_file = matched_files.append
+    
+    for entry in entries:
+        name_folded = entry.name.casefold()
+        if query_folded not in name_folded:
+            continue
+        
+        item_info = get_info(entry)
+        if not item_info:
+            continue
+        
+        if item_info['is_directory']:
+            add_dir((name_folded, item_info))
+        else:
+            add_file((name_folded, item_info))
+
+
+def _search_subtree(root: str, query_folded: str) -> Tuple[list, list]:
+    """在一个子树内串行搜索，返回(匹配的目录, 匹配的文件)"""
+    matched_dirs = []
+    matched_files = []
+    for _, entries in _walk_fast(root, ignore_errors=True):
+        _match_entries(entries, query_folded, matched_dirs, matched_files)
+    return matched_dirs, matched_files
+
+
+def _search_one_dir(path: str, query_folded: str) -> Tuple[list, list, List[str]]:
+    """搜索单个目录（不递归），返回(匹配的目录, 匹配的文件, 子目录路径)"""
+    matched_dirs = []
+    matched_files = []
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return matched_dirs, matched_files, []
+    
+    _match_entries(entries, query_folded, matched_dirs, matched_files)
+    subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    return matched_dirs, matched_files, subdirs
+
+
+# 顶层子目录数不超过该值时串行搜索，线程调度开销不划算
+_PARALLEL_SEARCH_MIN_SUBDIRS = 4
+
+
+# 全局文件IO线程池，供耗时的复制/移动异步调用共享
+_io_executor = None
+
+def _get_io_executor(max_workers: int) -> ThreadPoolExecutor:
+    """获取文件IO线程池实例"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="FileIO")
+    return _io_executor
+
+
+# 搜索专用线程池，与复制/移动分开，避免后台任务占满线程时搜索排队
+_search_executor = None
+
+def _get_search_executor(max_workers: int) -> ThreadPoolExecutor:
+    """获取搜索线程池实例"""
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="FileSearch")
+    return _search_executor
+
+
+# 删除等操作中与文件系统操作并行的数据库清理任务，耗时短，与复制/移动分开
+_AUX_WORKERS = 4
+_aux_executor = None
+
+def _get_aux_executor() -> ThreadPoolExecutor:
+    """获取辅助任务线程池实例"""
+    global _aux_executor
+    if _aux_executor is None:
+        _aux_executor = ThreadPoolExecutor(max_workers=_AUX_WORKERS, thread_name_prefix="FileAux")
+    return _aux_executor
+
+
+# 删除源文件时查询和停用相关共享记录的语句，只定义一次，所有调用共享同一语句文本。
+# PyMySQL只支持文本协议，SQL级PREPARE/EXECUTE需按连接准备且每次多一次往返，反而更慢；
+# 两条语句都由idx_shared_active索引定位。
+_SHARED_RECORDS_SQL = """
+SELECT shared_file_path, owner_username
+FROM shared_files
+WHERE original_file_path = %s AND is_active = TRUE
+"""
+
+_DEACTIVATE_SHARES_SQL = """
+UPDATE shared_files SET is_active = FALSE
+WHERE original_file_path = %s AND is_active = TRUE
+"""
+
+
+# 相关共享文件不超过该数量时在当前线程逐个删除，线程池调度开销不划算
+_SHARE_REMOVE_INLINE_MAX = 8
+
+
+def _remove_shared_file(shared_path: str) -> bool:
+    """删除一个共享文件，返回是否成功（已不存在视为成功），失败只记录日志"""
+    try:
+        os.remove(shared_path)
+        logger.debug("删除共享文件: %s", shared_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error("清理共享文件失败: %s, 错误: %s", shared_path, e)
+        return False
+    return True
+
+
+# 删除目录时先原子地改名到回收目录，再由后台线程删除，请求无需等待整棵树删完。
+# 回收目录位于根目录旁：与根目录同一文件系统（rename为O(1)），且不会出现在目录列表和搜索中
+_trash_queue: "queue.Queue[str]" = queue.Queue()
+_trash_lock = threading.Lock()
+_trash_dir: Optional[str] = None
+_trash_initialized = False
+
+
+def _trash_worker() -> None:
+    """后台删除回收目录中的条目"""
+    while True:
+        path = _trash_queue.get()
+        st = FileUtils.stat_or_none(path, follow_symlinks=False)
+        if st is None:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            # 符号链接（rmtree会拒绝）或普通文件直接删除条目本身
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        if os.path.lexists(path):
+            logger.warning("回收目录中的条目未能完全删除: %s", path)
+
+
+def _get_trash_dir(root: str) -> Optional[str]:
+    """返回回收目录（首次调用时创建并启动后台删除线程），无法创建时返回None"""
+    global _trash_dir, _trash_initialized
+    if _trash_initialized:
+        return _trash_dir
+    with _trash_lock:
+        if not _trash_initialized:
+            root = os.path.abspath(root)
+            trash_dir = os.path.join(os.path.dirname(root), f".{os.path.basename(root)}_trash")
+            try:
+                os.makedirs(trash_dir, exist_ok=True)
+                # 上次进程退出前未删完的条目
+                for name in os.listdir(trash_dir):
+                    _trash_queue.put(os.path.join(trash_dir, name))
+                threading.Thread(target=_trash_worker, daemon=True, name="FileTrashCollector").start()
+                _trash_dir = trash_dir
+            except OSError as e:
+                logger.warning("回收目录不可用，删除目录将同步执行: %s", e)
+            _trash_initialized = True
+    return _trash_dir
+
+
+# 数据库可用性探测结果缓存，避免每次文件操作都向MySQL发一次探测查询
+_DB_ALIVE_TTL = 1.0
+_db_alive = False
+_db_alive_checked_at = float('-inf')
+_db_alive_lock = threading.Lock()
+
+
+def _probe_db_alive(mysql_service) -> bool:
+    """返回缓存的数据库可用性，超过TTL时重新探测"""
+    global _db_alive, _db_alive_checked_at
+    if time.monotonic() - _db_alive_checked_at < _DB_ALIVE_TTL:
+        return _db_alive
+    with _db_alive_lock:
+        now = time.monotonic()
+        if now - _db_alive_checked_at >= _DB_ALIVE_TTL:
+            _db_alive = mysql_service.is_connected()
+            _db_alive_checked_at = now
+    return _db_alive
+
+
+# 文件信息写入器：请求路径只入队，不等待数据库
+_file_info_writer = BatchWriter("FileInfoWriter")
+
+# 最近写入数据库的文件快照 path -> (size, modified_time)，未变化时跳过重复写入
+_FILE_SNAPSHOT_MAX = 50000
+_file_snapshots: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+_file_snapshots_lock = threading.Lock()
+
+
+def _remember_file_snapshot(path: str, snapshot: Tuple[Any, Any]) -> bool:
+    """记录文件快照，与上次相同返回False"""
+    with _file_snapshots_lock:
+        if _file_snapshots.get(path) == snapshot:
+            _file_snapshots.move_to_end(path)
+            return False
+        _file_snapshots[path] = snapshot
+        _file_snapshots.move_to_end(path)
+        if len(_file_snapshots) > _FILE_SNAPSHOT_MAX:
+            _file_snapshots.popitem(last=False)
+        return True
+
+
+def _forget_file_snapshot(path: str) -> None:
+    """文件被删除或改名后，清除其快照"""
+    with _file_snapshots_lock:
+        _file_snapshots.pop(path, None)
+
+
+def _write_file_infos(mysql_service, db_file_infos: List[Dict[str, Any]]) -> None:
+    """批量写入文件信息
+    
+    同一批次内同一路径只写入最后一条；入队后已被删除的路径不再写入，避免复活已删除的记录
+    """
+    latest = {info['file_path']: info for info in db_file_infos}
+    alive = [info for path, info in latest.items() if os.path.lexists(path)]
+    if alive:
+        mysql_service.save_file_infos_bulk(alive)
+
+
+# 后台复制/移动任务表，task_id -> 任务状态
+_TASK_RETENTION = 3600  # 已结束任务保留1小时供查询
+_tasks: Dict[str, Dict[str, Any]] = {}
+_tasks_lock = threading.Lock()
+
+
 class FileService:
     """文件服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.cache_service = get_cache_service()
+        self.security_service = get_security_service()
+        self._executor = _get_io_executor(self.config.FILE_IO_WORKERS)
         self.mysql_service = None
         
-        # 尝试初始化MySQL服务
+        # 尝试初始化MySQL服务；连接状态在每次写库前检查，构造时不做探测
         try:
             self.mysql_service = get_mysql_service()
-            if self.mysql_service and self.mysql_service.is_connected():
-                logger.info("MySQL服务集成成功")
-            else:
-                logger.warning("MySQL服务不可用，将跳过数据库日志记录")
         except Exception as e:
-            logger.warning(f"MySQL服务初始化失败: {e}")
+            logger.warning("MySQL服务初始化失败: %s", e)
+    
+    def _db_available(self) -> bool:
+        """MySQL服务是否可用（探测结果在进程内缓存1秒）"""
+        return self.mysql_service is not None and _probe_db_alive(self.mysql_service)
     
     def _log_operation(self, operation_type: str, file_path: str = None, 
                        file_name: str = None, file_size: int = None, 
                        user_ip: str = None, user_agent: str = None,
                        status: str = 'success', error_message: str = None,
                        duration_ms: int = None):
-        """记录文件操作到MySQL数据库"""
-        if not self.mysql_service or not self.mysql_service.is_connected():
+        """记录文件操作到MySQL数据库（异步批量写入）"""
+        if not self._db_available():
             return
         
-        try:
-            self.mysql_service.log_file_operation(
-                operation_type=operation_type,
-                file_path=file_path,
-                file_name=file_name,
-                file_size=file_size,
-                user_ip=user_ip,
-                user_agent=user_agent,
-                status=status,
-                error_message=error_message,
-                duration_ms=duration_ms
-            )
-        except Exception as e:
-            logger.error(f"记录操作日志失败: {e}")
+        self.mysql_service.log_file_operation(
+            operation_type, file_path, file_name, file_size,
+            user_ip, user_agent, status, error_message, duration_ms
+        )
     
     def _save_file_info_to_db(self, file_path: str, file_info: Dict[str, Any]):
-        """保存文件信息到数据库"""
-        if not self.mysql_service or not self.mysql_service.is_connected():
+        """保存文件信息到数据库（入队后由后台线程批量写入，不阻塞请求）"""
+        if not file_info or not self._db_available():
             return
         
+        _remember_file_snapshot(file_path, (file_info.get('size'), file_info.get('modified_time')))
+        flush = functools.partial(_write_file_infos, self.mysql_service)
+        if not _file_info_writer.submit(self._to_db_file_info(file_info), flush):
+            _forget_file_snapshot(file_path)
+            logger.warning("文件信息写入队列已满，跳过: %s", file_path)
+    
+    def _save_file_info_async(self, file_info: Dict[str, Any]) -> None:
+        """查看文件信息时保存到数据库，文件大小和修改时间未变化时跳过"""
+        if not self.config.FILE_INFO_DB_WRITE_ENABLED:
+            return
+        
+        snapshot = (file_info.get('size'), file_info.get('modified_time'))
+        if not _remember_file_snapshot(file_info['path'], snapshot):
+            return
+        
+        self._save_file_info_to_db(file_info['path'], file_info)
+    
+    @staticmethod
+    def _to_db_file_info(file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """将文件信息转换为数据库期望的字段格式"""
+        db_file_info = {
+            'file_path': file_info.get('path'),  # 从 'path' 转换为 'file_path'
+            'file_name': file_info.get('name'),  # 从 'name' 转换为 'file_name'
+            'file_size': file_info.get('size', 0),
+            'file_type': file_info.get('file_type'),
+            'mime_type': file_info.get('mime_type'),
+            'hash_value': file_info.get('hash_value'),
+            'is_directory': file_info.get('is_directory', False),
+            'parent_path': os.path.dirname(file_info.get('path', '')),
+            'permissions': file_info.get('permissions'),
+            'owner': 'system',  # 默认所有者
+            'group_name': 'system'  # 默认组
+        }
+        
+        # 验证必要字段
+        if not db_file_info['file_path']:
+            raise ValueError(f"文件路径不能为空: {file_info}")
+        
+        return db_file_info
+    
+    def _rename_file_info_in_db(self, old_path: str, new_file_info: Dict[str, Any]):
+        """将数据库中的文件记录原地改为新路径
+        
+        一条UPDATE完成；新路径已有陈旧记录（唯一键冲突）时，删除陈旧记录后在同一事务中重试，
+        目录下的子记录一并改为新路径；旧记录不存在或重试仍失败时，回退为删除旧记录再写入新记录
+        """
+        if not self._db_available():
+            return
+        
+        _forget_file_snapshot(old_path)
+        db_file_info = self._to_db_file_info(new_file_info)
         try:
-            # 转换字段名以匹配数据库期望的格式
-            db_file_info = {
-                'file_path': file_info.get('path'),  # 从 'path' 转换为 'file_path'
-                'file_name': file_info.get('name'),  # 从 'name' 转换为 'file_name'
-                'file_size': file_info.get('size', 0),
-                'file_type': file_info.get('file_type'),
-                'mime_type': file_info.get('mime_type'),
-                'hash_value': file_info.get('hash_value'),
-                'is_directory': file_info.get('is_directory', False),
-                'parent_path': os.path.dirname(file_info.get('path', '')),
-                'permissions': file_info.get('permissions'),
-                'owner': 'system',  # 默认所有者
-                'group_name': 'system'  # 默认组
-            }
-            
-            # 验证必要字段
-            if not db_file_info['file_path']:
-                raise ValueError(f"文件路径不能为空: {file_info}")
-            
-            self.mysql_service.save_file_info(db_file_info)
+            if self.mysql_service.rename_file_info(old_path, db_file_info) > 0:
+                return
         except Exception as e:
-            logger.error(f"保存文件信息到数据库失败: {e}")
-            # 重新抛出异常以便调试
-            raise
+            logger.warning("原地更新文件记录失败，删除新路径的陈旧记录后重试: %s", e)
+            try:
+                if self.mysql_service.rename_file_info(old_path, db_file_info, replace_existing=True) > 0:
+                    return
+            except Exception as e:
+                logger.warning("重试原地更新文件记录失败，改为删除后重新写入: %s", e)
+                self.mysql_service.delete_file_info(old_path)
+        
+        self.mysql_service.save_file_info(db_file_info)
     
     def _delete_file_info_from_db(self, file_path: str):
         """从数据库删除文件信息"""
-        if not self.mysql_service or not self.mysql_service.is_connected():
+        if not self._db_available():
             return
         
+        _forget_file_snapshot(file_path)
         try:
             self.mysql_service.delete_file_info(file_path)
         except Exception as e:
-            logger.error(f"从数据库删除文件信息失败: {e}")
+            logger.error("从数据库删除文件信息失败: %s", e)
             # 重新抛出异常以便调试
             raise
     
-    def list_directory(self, directory_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
-        """列出目录内容"""
-        start_time = time.time()
+    def _resolve_path(self, path: str, current_user: Dict[str, Any] = None,
+                      unsafe_message: str = "不安全的路径") -> str:
+        """安全检查路径，并按当前用户权限解析为实际路径"""
+        if not FileUtils.is_safe_path(path):
+            raise ValueError(unsafe_message)
+        
+        if current_user:
+            # 清理和验证用户路径
+            path = self.security_service.sanitize_path_for_user(
+                current_user['user_id'], 
+                current_user['email'], 
+                path
+            )
+        
+        return path
+    
+    def _require_existing(self, path: str, missing_message: str) -> os.stat_result:
+        """确认路径存在并返回其stat结果"""
+        st = _stat_or_none(path, use_missing_cache=True)
+        if st is None:
+            raise FileNotFoundError(missing_message)
+        return st
+    
+    def _listing_path(self, directory_path: str) -> str:
+        """将目录列表请求的路径转换为实际路径：空路径或"."使用配置的根目录"""
+        if directory_path == "" or directory_path == ".":
+            # 使用配置的根目录而不是当前工作目录
+            return self.config.FILESYSTEM_ROOT
+        # 清理路径中的多余空格
+        return directory_path.strip()
+    
+    def _resolve_source_target(self, source_path: str, target_path: str,
+                               current_user: Dict[str, Any] = None) -> Tuple[str, os.stat_result, str]:
+        """解析移动/复制的源和目标路径：源必须存在，目标必须不存在
+        
+        返回 (源路径, 源stat结果, 目标路径)
+        """
+        if not FileUtils.is_safe_path(source_path):
+            raise ValueError("源路径不安全")
+        
+        if not FileUtils.is_safe_path(target_path):
+            raise ValueError("目标路径不安全")
+        
+        source_path = self._resolve_path(source_path, current_user)
+        target_path = self._resolve_path(target_path, current_user)
+        
+        source_st = self._require_existing(source_path, "源文件不存在")
+        
+        if _stat_or_none(target_path) is not None:
+            raise FileExistsError("目标路径已存在")
+        
+        return source_path, source_st, target_path
+    
+    def _parallel_copytree(self, src: str, dst: str, progress: Dict[str, Any] = None) -> None:
+        """并行复制目录树：遍历时建好目录，发现的文件立即提交给线程池复制
+        
+        目录遍历与文件复制重叠进行，不必等整棵树遍历完才开始复制。
+        progress: 可选的进度字典，复制过程中更新 files_total / files_done
+        """
+        os.makedirs(dst)
+        dir_pairs = [(src, dst)]
+        dst_dirs = {src: dst}
+        futures = []
+        
+        if progress is not None:
+            progress['files_total'] = 0
+            progress['files_done'] = 0
+        
+        join = os.path.join
+        mkdir = os.mkdir
+        fast_copy = FileUtils.fast_copy
+        
+        with ThreadPoolExecutor(max_workers=self.config.FILE_IO_WORKERS) as executor:
+            submit = executor.submit
+            for src_dir, entries in _walk_fast(src, follow_symlinks=True):
+                dst_dir = dst_dirs.pop(src_dir)
+                for entry in entries:
+                    target = join(dst_dir, entry.name)
+                    if entry.is_dir():
+                        mkdir(target)
+                        dir_pairs.append((entry.path, target))
+                        dst_dirs[entry.path] = target
+                    else:
+                        futures.append(submit(fast_copy, entry.path, target))
+                        if progress is not None:
+                            progress['files_total'] += 1
+            
+            # 在当前线程消费结果，使工作线程中的异常在此处抛出
+            for future in as_completed(futures):
+                future.result()
+                if progress is not None:
+                    progress['files_done'] += 1
+        
+        # 文件写入会改变目录mtime，最后自底向上复制目录元数据
+        for src_dir, dst_dir in reversed(dir_pairs):
+            shutil.copystat(src_dir, dst_dir)
+    
+    def _parallel_rmtree(self, path: str) -> None:
+        """并行删除目录树：线程池删除文件，再自底向上删除目录
+        
+        与shutil.rmtree一致，拒绝删除符号链接，避免经由链接删除其目标目录中的文件
+        """
+        if os.path.islink(path):
+            raise OSError(f"不能对符号链接执行目录删除: {path}")
+        
+        dirs = []
+        files = []
+        
+        for current, entries in _walk_fast(path):
+            dirs.append(current)
+            files.extend(entry.path for entry in entries
+                         if not entry.is_dir(follow_symlinks=False))
+        
+        if files:
+            workers = min(self.config.FILE_IO_WORKERS, len(files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(os.unlink, files))
+        
+        # 子目录总是在父目录之后被发现，逆序即可保证先删子目录
+        for directory in reversed(dirs):
+            os.rmdir(directory)
+    
+    def _move_to_trash(self, path: str) -> bool:
+        """将目录改名到回收目录并交给后台线程删除
+        
+        回收目录不可用或无法改名（如跨文件系统）时返回False，由调用方同步删除
+        """
+        trash_dir = _get_trash_dir(self.config.FILESYSTEM_ROOT)
+        if trash_dir is None:
+            return False
+        
+        trash_path = os.path.join(trash_dir, uuid.uuid4().hex)
+        try:
+            os.rename(path, trash_path)
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            logger.debug("无法移入回收目录，改为同步删除: %s, %s", path, e)
+            return False
+        
+        _trash_queue.put(trash_path)
+        return True
+    
+    def list_directory(self, directory_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None,
+                       offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """列出目录内容
+        
+        指定limit时只返回排序后[offset, offset+limit)范围内的条目；
+        已有完整列表缓存时直接截取，否则只为该页条目构建文件信息（分页结果不缓存）。
+        """
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(directory_path):
-                raise ValueError("不安全的路径")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                directory_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    directory_path
-                )
+            # 安全检查并按用户权限解析路径
+            directory_path = self._resolve_path(directory_path, current_user)
             
-            # 处理空路径或"."，使用配置的根目录
-            if directory_path == "" or directory_path == ".":
-                # 使用配置的根目录而不是当前工作目录
-                actual_path = self.config.FILESYSTEM_ROOT
-                directory_path = actual_path
-            else:
-                # 清理路径中的多余空格
-                directory_path = directory_path.strip()
-                actual_path = directory_path
+            directory_path = actual_path = self._listing_path(directory_path)
+            
+            # 进程内缓存：目录自身mtime未变时，一次stat即可返回上次的结果
+            dir_st = _stat_or_none(actual_path)
+            cached_listing = _get_cached_listing(actual_path, dir_st)
+            if cached_listing is not None:
+                logger.debug("进程内缓存命中 - 目录列表: %s", directory_path)
+                return _paginate_listing(cached_listing, offset, limit)
             
             # 生成包含用户信息的缓存键
             user_id = current_user['user_id'] if current_user else 'anonymous'
-            cache_key = f"dir_listing:{user_id}:{hashlib.md5(directory_path.encode()).hexdigest()[:16]}"
+            cache_key = f"dir_listing:{user_id}:{_path_key(directory_path)}"
             
             # 尝试从缓存获取
             cached_result = self.cache_service.get(cache_key)
             if cached_result:
-                logger.info(f"✅ 缓存命中 - 目录列表: {directory_path}, 缓存键: {cache_key}")
-                logger.info(f"缓存数据项目数量: {len(cached_result.get('items', []))}")
-                # 更新最后访问时间
-                cached_result['cached_at'] = time.time()
-                return cached_result
+                logger.info("✅ 缓存命中 - 目录列表: %s, 缓存键: %s", directory_path, cache_key)
+                logger.info("缓存数据项目数量: %s", len(cached_result.get('items', [])))
+                return _paginate_listing(cached_result, offset, limit)
             
             # 缓存未命中，从文件系统获取
-            logger.info(f"❌ 缓存未命中 - 目录列表: {directory_path}, 缓存键: {cache_key}")
+            logger.info("❌ 缓存未命中 - 目录列表: %s, 缓存键: %s", directory_path, cache_key)
             
-            # 获取目录内容
-            items = []
+            if limit is not None:
+                result = _scan_listing_page(actual_path, offset, limit)
+                
+                duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+                self._log_operation(
+                    operation_type='list_directory',
+                    file_path=directory_path,
+                    user_ip=user_ip,
+                    user_agent=user_agent,
+                    status='success',
+                    duration_ms=duration_ms
+                )
+                return result
+            
+            # 获取目录内容，目录和文件分开收集，排序键只计算一次
+            dirs = []
+            files = []
             total_size = 0
-            file_count = 0
-            dir_count = 0
+            
+            # 循环内反复使用的函数绑定为局部变量，省去每次的属性查找
+            get_info = FileUtils.get_file_info_from_entry
+            add_dir = dirs.append
+            add_file = files.append
             
             try:
-                for item in os.listdir(actual_path):
-                    item_path = os.path.join(actual_path, item)
-                    item_info = FileUtils.get_file_info(item_path)
-                    
-                    if item_info:
-                        items.append(item_info)
-                        if item_info['is_directory']:
-                            dir_count += 1
-                        else:
-                            file_count += 1
-                            total_size += item_info['size']
+                with os.scandir(actual_path) as it:
+                    for entry in it:
+                        item_info = get_info(entry, True)
+                        
+                        if item_info:
+                            if item_info['is_directory']:
+                                add_dir((entry.name.casefold(), item_info))
+                            else:
+                                add_file((entry.name.casefold(), item_info))
+                                total_size += item_info['size']
             except PermissionError:
                 raise PermissionError("目录访问被拒绝")
             
-            # 按类型和名称排序
-            items.sort(key=lambda x: (not x['is_directory'], x['name'].lower()))
+            dir_count = len(dirs)
+            file_count = len(files)
             
-            # 处理items中的datetime对象，转换为字符串
-            processed_items = []
-            for item in items:
-                processed_item = item.copy()
-                if 'created_time' in processed_item and hasattr(processed_item['created_time'], 'isoformat'):
-                    processed_item['created_time'] = processed_item['created_time'].isoformat()
-                if 'modified_time' in processed_item and hasattr(processed_item['modified_time'], 'isoformat'):
-                    processed_item['modified_time'] = processed_item['modified_time'].isoformat()
-                processed_items.append(processed_item)
+            # 目录在前，各自按名称排序（时间字段在扫描时已是字符串，无需再转换）
+            items = _sorted_by_name(dirs) + _sorted_by_name(files)
             
             result = {
                 'path': directory_path,
-                'items': processed_items,
+                'items': items,
                 'total_items': len(items),
                 'file_count': file_count,
                 'dir_count': dir_count,
@@ -199,6 +799,7 @@ class FileService:
             }
             
             # 缓存结果
+            _put_cached_listing(actual_path, dir_st, result)
             cache_success = self.cache_service.set(
                 cache_key, 
                 result, 
@@ -206,12 +807,13 @@ class FileService:
                 data_size=len(items)
             )
             if cache_success:
-                logger.info(f"💾 目录列表已缓存: {directory_path} (键: {cache_key})")
+                self.cache_service.track_path(actual_path, cache_key)
+                logger.info("💾 目录列表已缓存: %s (键: %s)", directory_path, cache_key)
             else:
-                logger.warning(f"⚠️ 目录列表缓存失败: {directory_path}")
+                logger.warning("⚠️ 目录列表缓存失败: %s", directory_path)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='list_directory',
                 file_path=directory_path,
@@ -224,7 +826,71 @@ class FileService:
             return result
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            self._log_operation(
+                operation_type='list_directory',
+                file_path=directory_path,
+                user_ip=user_ip,
+                user_agent=user_agent,
+                status='failed',
+                error_message=str(e),
+                duration_ms=duration_ms
+            )
+            raise
+    
+    def list_directory_columnar(self, directory_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
+        """以列式结构列出目录内容
+        
+        返回 {'columns': {字段名: [值, ...]}, ...}，顺序与list_directory一致（目录在前，按名称排序）。
+        不为每个条目创建字典，也不计算文件哈希，大目录下内存占用和序列化开销都更小。
+        """
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            # 安全检查并按用户权限解析路径
+            directory_path = self._resolve_path(directory_path, current_user)
+            directory_path = self._listing_path(directory_path)
+            
+            dirs = []
+            files = []
+            try:
+                with os.scandir(directory_path) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            continue
+                        (dirs if is_dir else files).append((entry.name.casefold(), entry))
+            except PermissionError:
+                raise PermissionError("目录访问被拒绝")
+            
+            columns = FileUtils.get_file_info_columnar(_sorted_by_name(dirs) + _sorted_by_name(files))
+            total_items = len(columns['name'])
+            dir_count = sum(columns['is_directory'])
+            total_size = sum(columns['size'])
+            
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            self._log_operation(
+                operation_type='list_directory',
+                file_path=directory_path,
+                user_ip=user_ip,
+                user_agent=user_agent,
+                status='success',
+                duration_ms=duration_ms
+            )
+            
+            return {
+                'path': directory_path,
+                'columns': columns,
+                'total_items': total_items,
+                'file_count': total_items - dir_count,
+                'dir_count': dir_count,
+                'total_size': total_size,
+                'formatted_size': FileUtils.format_file_size(total_size)
+            }
+            
+        except Exception as e:
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='list_directory',
                 file_path=directory_path,
@@ -238,42 +904,28 @@ class FileService:
     
     def get_file_info(self, file_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """获取文件信息"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(file_path):
-                raise ValueError("不安全的路径")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                file_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    file_path
-                )
+            # 安全检查并按用户权限解析路径
+            file_path = self._resolve_path(file_path, current_user)
             
             # 生成包含用户信息的缓存键
             user_id = current_user['user_id'] if current_user else 'anonymous'
-            cache_key = f"file_info:{user_id}:{hashlib.md5(file_path.encode()).hexdigest()[:16]}"
+            cache_key = f"file_info:{user_id}:{_path_key(file_path)}"
             
             # 尝试从缓存获取
             cached_file_info = self.cache_service.get(cache_key)
             if cached_file_info:
-                logger.debug(f"从缓存获取文件信息: {file_path}")
-                # 更新最后访问时间
-                cached_file_info['cached_at'] = time.time()
+                logger.debug("从缓存获取文件信息: %s", file_path)
                 return cached_file_info
             
             # 缓存未命中，从文件系统获取
-            logger.debug(f"缓存未命中，从文件系统获取文件信息: {file_path}")
+            logger.debug("缓存未命中，从文件系统获取文件信息: %s", file_path)
             
             # 获取文件信息
-            file_info = FileUtils.get_file_info(file_path)
+            # 时间字段直接取ISO字符串，与目录列表一致，缓存和响应都无需再转换
+            file_info = FileUtils.get_file_info(file_path, as_str=True)
             if not file_info:
                 raise FileNotFoundError("文件不存在")
             
@@ -281,18 +933,19 @@ class FileService:
             file_info['cached_at'] = time.time()
             
             # 缓存文件信息
-            self.cache_service.set(
+            if self.cache_service.set(
                 cache_key, 
                 file_info, 
                 data_type='file_info'
-            )
-            logger.debug(f"文件信息已缓存: {file_path}")
+            ):
+                self.cache_service.track_path(file_path, cache_key)
+            logger.debug("文件信息已缓存: %s", file_path)
             
-            # 保存文件信息到数据库
-            self._save_file_info_to_db(file_path, file_info)
+            # 保存文件信息到数据库（后台批量写入，不阻塞读取）
+            self._save_file_info_async(file_info)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='get_file_info',
                 file_path=file_path,
@@ -307,7 +960,7 @@ class FileService:
             return file_info
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='get_file_info',
                 file_path=file_path,
@@ -321,31 +974,18 @@ class FileService:
     
     def create_directory(self, directory_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """创建目录"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(directory_path):
-                raise ValueError("不安全的路径")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                directory_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    directory_path
-                )
+            # 安全检查并按用户权限解析路径
+            directory_path = self._resolve_path(directory_path, current_user)
             
-            # 检查目录是否已存在
-            if os.path.exists(directory_path):
+            # 创建目录；已存在时由makedirs原子地报错，无需事先检查
+            try:
+                os.makedirs(directory_path)
+            except FileExistsError:
                 raise FileExistsError("目录已存在")
-            
-            # 创建目录
-            os.makedirs(directory_path, exist_ok=True)
+            _forget_missing(directory_path)
             
             # 获取新创建的目录信息
             dir_info = FileUtils.get_file_info(directory_path)
@@ -353,12 +993,11 @@ class FileService:
             # 保存目录信息到数据库
             self._save_file_info_to_db(directory_path, dir_info)
             
-            # 清理父目录缓存
-            parent_dir = os.path.dirname(directory_path) if directory_path != '.' else '.'
-            self._invalidate_cache(parent_dir, current_user)
+            # 清理新目录及其父目录的缓存
+            self._invalidate_cache(directory_path, current_user)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='create_folder',
                 file_path=directory_path,
@@ -376,7 +1015,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='create_folder',
                 file_path=directory_path,
@@ -390,69 +1029,62 @@ class FileService:
     
     def delete_file(self, file_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """删除文件或目录"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(file_path):
-                raise ValueError("不安全的路径")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                file_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    file_path
-                )
+            # 安全检查并按用户权限解析路径
+            file_path = self._resolve_path(file_path, current_user)
             
-            # 检查文件是否存在
-            if not os.path.exists(file_path):
-                logger.warning(f"文件不存在，无法删除: {file_path}")
+            # 检查文件是否存在；用lstat判断类型，指向目录的符号链接只删除链接本身
+            st = _stat_or_none(file_path, use_missing_cache=True, follow_symlinks=False)
+            if st is None:
+                logger.warning("文件不存在，无法删除: %s", file_path)
                 raise FileNotFoundError("文件不存在")
             
-            logger.info(f"文件存在，准备删除: {file_path}")
-            
-            # 获取文件信息（用于日志记录）
-            file_info = FileUtils.get_file_info(file_path)
-            logger.info(f"文件信息: {file_info}")
-            
-            # 在删除源文件之前，检查并清理相关的共享文件
-            self._cleanup_related_shares(file_path)
+            logger.info("文件存在，准备删除: %s", file_path)
             
-            # 删除文件或目录
-            if os.path.isdir(file_path):
-                logger.info(f"删除目录: {file_path}")
-                shutil.rmtree(file_path)
-                operation_type = 'delete_folder'
-            else:
-                logger.info(f"删除文件: {file_path}")
-                os.remove(file_path)
-                operation_type = 'delete'
-            
-            # 验证文件是否真的被删除
-            if os.path.exists(file_path):
-                logger.error(f"文件删除失败，文件仍然存在: {file_path}")
-                raise Exception("文件删除失败")
-            else:
-                logger.info(f"文件删除成功，文件已不存在: {file_path}")
+            # 日志所需字段直接取自已有的stat结果
+            is_dir = stat.S_ISDIR(st.st_mode)
+            is_link = stat.S_ISLNK(st.st_mode)
+            file_name = os.path.basename(file_path)
+            file_size = 0 if is_dir or is_link else st.st_size
             
-            # 从数据库删除文件信息
-            self._delete_file_info_from_db(file_path)
+            # 清理相关共享文件与删除源文件、删除数据库记录互不依赖，在后台并行执行
+            # （_cleanup_related_shares自行捕获异常）；共享记录中保存的是绝对路径
+            shares_future = _get_aux_executor().submit(
+                self._cleanup_related_shares, os.path.abspath(file_path)
+            )
+            try:
+                # 删除文件或目录（在当前线程执行，异常直接向上抛出）
+                if is_dir:
+                    logger.info("删除目录: %s", file_path)
+                    if not self._move_to_trash(file_path):
+                        self._parallel_rmtree(file_path)
+                    operation_type = 'delete_folder'
+                else:
+                    # 普通文件或符号链接（不跟随链接，不会删除链接目标）
+                    logger.info("删除文件: %s", file_path)
+                    os.unlink(file_path)
+                    operation_type = 'delete'
+                
+                # os.remove/os.rmdir失败时会直接抛出异常，执行到这里即已删除
+                logger.info("文件删除成功: %s", file_path)
+                
+                # 从数据库删除文件信息
+                self._delete_file_info_from_db(file_path)
+            finally:
+                shares_future.result()
             
             # 清理相关缓存（在文件删除后）
             self._invalidate_cache(file_path, current_user)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type=operation_type,
                 file_path=file_path,
-                file_name=file_info['name'] if file_info else None,
-                file_size=file_info['size'] if file_info else None,
+                file_name=file_name,
+                file_size=file_size,
                 user_ip=user_ip,
                 user_agent=user_agent,
                 status='success',
@@ -466,7 +1098,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='delete',
                 file_path=file_path,
@@ -480,65 +1112,62 @@ class FileService:
     
     def rename_file(self, old_path: str, new_name: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """重命名文件或目录"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(old_path):
-                raise ValueError("不安全的路径")
-            
             if not FileUtils.is_safe_path(new_name):
                 raise ValueError("新名称包含不安全字符")
             
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                old_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    old_path
-                )
-            
-            # 检查源文件是否存在
-            if not os.path.exists(old_path):
-                raise FileNotFoundError("源文件不存在")
+            # 安全检查并按用户权限解析路径，确认源文件存在
+            old_path = self._resolve_path(old_path, current_user)
+            old_st = self._require_existing(old_path, "源文件不存在")
             
             # 构建新路径
-            parent_dir = os.path.dirname(old_path)
+            parent_dir, old_name = os.path.split(old_path)
             new_path = os.path.join(parent_dir, new_name)
             
-            # 检查目标文件是否已存在
-            if os.path.exists(new_path):
+            # 检查目标文件是否已存在（POSIX的rename会静默覆盖已有文件，此检查不能省略）
+            if _stat_or_none(new_path) is not None:
                 raise FileExistsError("目标文件已存在")
             
             # 获取原文件信息
-            old_file_info = FileUtils.get_file_info(old_path)
+            old_file_info = FileUtils.get_file_info(old_path, old_st, name=old_name)
             
             # 重命名文件
-            os.rename(old_path, new_path)
-            
-            # 获取新文件信息
-            new_file_info = FileUtils.get_file_info(new_path)
+            try:
+                os.rename(old_path, new_path)
+            except FileNotFoundError:
+                # 检查之后源文件被并发删除
+                raise FileNotFoundError("源文件不存在")
+            except OSError as e:
+                # 目标为非空目录等情况
+                if e.errno in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise FileExistsError("目标文件已存在")
+                raise
+            _forget_missing(new_path)
+            
+            # 重命名不改变文件类型和内容，由重命名前的信息推导，避免重复stat和哈希计算
+            if old_file_info:
+                new_file_info = dict(old_file_info, name=os.path.basename(new_path), path=new_path)
+                if not old_file_info['is_directory']:
+                    new_file_info['mime_type'] = FileUtils.get_mime_type(new_path)
+                    new_file_info['file_type'] = os.path.splitext(new_path)[1]
+            else:
+                new_file_info = FileUtils.get_file_info(new_path)
             
             # 清理相关缓存
             self._invalidate_cache(old_path, current_user)
             self._invalidate_cache(new_path, current_user)
             
             # 更新数据库中的文件信息
-            if self.mysql_service and self.mysql_service.is_connected():
+            if self._db_available():
                 try:
-                    # 删除旧记录
-                    self._delete_file_info_from_db(old_path)
-                    # 添加新记录
-                    self._save_file_info_to_db(new_path, new_file_info)
+                    self._rename_file_info_in_db(old_path, new_file_info)
                 except Exception as db_error:
-                    logger.warning(f"更新数据库文件信息失败: {db_error}")
+                    logger.warning("更新数据库文件信息失败: %s", db_error)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='rename',
                 file_path=new_path,
@@ -559,7 +1188,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='rename',
                 file_path=old_path,
@@ -573,66 +1202,50 @@ class FileService:
     
     def move_file(self, source_path: str, target_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """移动文件或目录"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(source_path):
-                raise ValueError("源路径不安全")
-            
-            if not FileUtils.is_safe_path(target_path):
-                raise ValueError("目标路径不安全")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                source_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    source_path
-                )
-                target_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    target_path
-                )
-            
-            # 检查源文件是否存在
-            if not os.path.exists(source_path):
-                raise FileNotFoundError("源文件不存在")
-            
-            # 检查目标路径是否已存在
-            if os.path.exists(target_path):
-                raise FileExistsError("目标路径已存在")
-            
-            # 获取源文件信息
-            source_file_info = FileUtils.get_file_info(source_path)
-            
-            # 移动文件
-            shutil.move(source_path, target_path)
+            # 安全检查、权限解析及源/目标存在性检查
+            source_path, source_st, target_path = self._resolve_source_target(
+                source_path, target_path, current_user
+            )
             
-            # 获取移动后的文件信息
-            target_file_info = FileUtils.get_file_info(target_path)
+            # 移动文件：同一文件系统内一次rename系统调用即可完成，
+            # 跨文件系统（EXDEV）时才回退到shutil.move的复制+删除
+            try:
+                os.rename(source_path, target_path)
+            except FileNotFoundError:
+                # ENOENT既可能是检查之后源文件被并发删除，也可能是目标的父目录不存在
+                if not os.path.lexists(source_path):
+                    raise FileNotFoundError("源文件不存在")
+                raise FileNotFoundError("目标目录不存在")
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    shutil.move(source_path, target_path)
+                    # 跨文件系统移动产生了新文件，需要重新stat
+                    source_st = None
+                elif e.errno in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise FileExistsError("目标文件已存在")
+                else:
+                    raise
+            _forget_missing(target_path)
+            
+            # 获取移动后的文件信息；rename不改变inode，直接复用移动前的stat结果
+            target_file_info = FileUtils.get_file_info(target_path, source_st)
             
             # 清理相关缓存
             self._invalidate_cache(source_path, current_user)
             self._invalidate_cache(target_path, current_user)
             
             # 更新数据库中的文件信息
-            if self.mysql_service and self.mysql_service.is_connected():
+            if self._db_available():
                 try:
-                    # 删除旧记录
-                    self._delete_file_info_from_db(source_path)
-                    # 添加新记录
-                    self._save_file_info_to_db(target_path, target_file_info)
+                    self._rename_file_info_in_db(source_path, target_file_info)
                 except Exception as db_error:
-                    logger.warning(f"更新数据库文件信息失败: {db_error}")
+                    logger.warning("更新数据库文件信息失败: %s", db_error)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='move',
                 file_path=target_path,
@@ -653,7 +1266,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='move',
                 file_path=source_path,
@@ -665,51 +1278,23 @@ class FileService:
             )
             raise
     
-    def copy_file(self, source_path: str, target_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
+    def copy_file(self, source_path: str, target_path: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None,
+                  progress: Dict[str, Any] = None) -> Dict[str, Any]:
         """复制文件或目录"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(source_path):
-                raise ValueError("源路径不安全")
-            
-            if not FileUtils.is_safe_path(target_path):
-                raise ValueError("目标路径不安全")
-            
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                source_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    source_path
-                )
-                target_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    target_path
-                )
-            
-            # 检查源文件是否存在
-            if not os.path.exists(source_path):
-                raise FileNotFoundError("源文件不存在")
-            
-            # 检查目标路径是否已存在
-            if os.path.exists(target_path):
-                raise FileExistsError("目标路径已存在")
-            
-            # 获取源文件信息
-            source_file_info = FileUtils.get_file_info(source_path)
+            # 安全检查、权限解析及源/目标存在性检查
+            source_path, source_st, target_path = self._resolve_source_target(
+                source_path, target_path, current_user
+            )
             
             # 复制文件
-            if os.path.isdir(source_path):
-                shutil.copytree(source_path, target_path)
+            if stat.S_ISDIR(source_st.st_mode):
+                self._parallel_copytree(source_path, target_path, progress)
             else:
-                shutil.copy2(source_path, target_path)
+                FileUtils.fast_copy(source_path, target_path)
+            _forget_missing(target_path)
             
             # 获取复制后的文件信息
             target_file_info = FileUtils.get_file_info(target_path)
@@ -721,7 +1306,7 @@ class FileService:
             self._save_file_info_to_db(target_path, target_file_info)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='copy',
                 file_path=target_path,
@@ -742,7 +1327,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='copy',
                 file_path=source_path,
@@ -756,54 +1341,48 @@ class FileService:
     
     def search_files(self, search_path: str, query: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """搜索文件"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            # 安全检查
-            if not FileUtils.is_safe_path(search_path):
-                raise ValueError("搜索路径不安全")
-            
             if not query or len(query.strip()) == 0:
                 raise ValueError("搜索查询不能为空")
             
-            # 用户权限检查
-            if current_user:
-                from services.security_service import get_security_service
-                security_service = get_security_service()
-                
-                # 清理和验证用户路径
-                search_path = security_service.sanitize_path_for_user(
-                    current_user['user_id'], 
-                    current_user['email'], 
-                    search_path
-                )
+            # 安全检查并按用户权限解析路径
+            search_path = self._resolve_path(search_path, current_user, "搜索路径不安全")
             
             # 执行搜索
-            results = []
-            query_lower = query.lower()
-            
-            for root, dirs, files in os.walk(search_path):
-                # 搜索目录
-                for dir_name in dirs:
-                    if query_lower in dir_name.lower():
-                        dir_path = os.path.join(root, dir_name)
-                        dir_info = FileUtils.get_file_info(dir_path)
-                        if dir_info:
-                            results.append(dir_info)
-                
-                # 搜索文件
-                for file_name in files:
-                    if query_lower in file_name.lower():
-                        file_path = os.path.join(root, file_name)
-                        file_info = FileUtils.get_file_info(file_path)
-                        if file_info:
-                            results.append(file_info)
-            
-            # 按类型和名称排序
-            results.sort(key=lambda x: (not x['is_directory'], x['name'].lower()))
+            # 大小写不敏感匹配，casefold同时处理非ASCII字符（如ß、希腊字母）
+            query_folded = query.casefold()
+            
+            # 顶层目录在当前线程搜索
+            matched_dirs, matched_files, subdirs = _search_one_dir(search_path, query_folded)
+            
+            if len(subdirs) <= _PARALLEL_SEARCH_MIN_SUBDIRS:
+                # 小树串行遍历
+                for subdir in subdirs:
+                    sub_dirs, sub_files = _search_subtree(subdir, query_folded)
+                    matched_dirs.extend(sub_dirs)
+                    matched_files.extend(sub_files)
+            else:
+                # 大树按目录粒度并行：每个目录是一个任务，发现的子目录立即作为新任务提交，
+                # 子树大小不均时也能保持所有线程忙碌
+                executor = _get_search_executor(self.config.FILE_IO_WORKERS)
+                pending = {executor.submit(_search_one_dir, subdir, query_folded) for subdir in subdirs}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        sub_dirs, sub_files, sub_subdirs = future.result()
+                        matched_dirs.extend(sub_dirs)
+                        matched_files.extend(sub_files)
+                        pending.update(
+                            executor.submit(_search_one_dir, subdir, query_folded) for subdir in sub_subdirs
+                        )
+            
+            # 目录在前，各自按名称排序
+            results = _sorted_by_name(matched_dirs) + _sorted_by_name(matched_files)
             
             # 记录操作日志
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='search',
                 file_path=search_path,
@@ -821,7 +1400,7 @@ class FileService:
             }
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             self._log_operation(
                 operation_type='search',
                 file_path=search_path,
@@ -833,84 +1412,183 @@ class FileService:
             )
             raise
     
+    # ---- 后台任务：大文件/目录的复制和移动立即返回task_id，客户端轮询状态 ----
+    
+    def _submit_task(self, operation: str, func, source_path: str, target_path: str,
+                     current_user: Dict[str, Any] = None, **kwargs) -> Dict[str, Any]:
+        """提交后台文件任务"""
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        task = {
+            'task_id': task_id,
+            'operation': operation,
+            'source_path': source_path,
+            'target_path': target_path,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now,
+            'owner': current_user['user_id'] if current_user else 'anonymous'
+        }
+        if 'progress' in kwargs:
+            task['progress'] = kwargs['progress']
+        
+        with _tasks_lock:
+            # 清理过期的已结束任务
+            expired = [tid for tid, t in _tasks.items()
+                       if t['status'] in ('completed', 'failed') and now - t['updated_at'] > _TASK_RETENTION]
+            for tid in expired:
+                del _tasks[tid]
+            _tasks[task_id] = task
+        
+        def run_task():
+            # 任务字典与get_task_status共享，字段变更都在_tasks_lock内一次完成
+            with _tasks_lock:
+                task.update(status='running', updated_at=time.time())
+            try:
+                outcome = {'result': func(source_path, target_path, current_user=current_user, **kwargs),
+                           'status': 'completed'}
+            except Exception as e:
+                logger.error("后台任务失败: %s, 错误: %s", task_id, e)
+                outcome = {'error': str(e), 'status': 'failed'}
+            with _tasks_lock:
+                task.update(outcome, updated_at=time.time())
+        
+        self._executor.submit(run_task)
+        logger.info("已提交后台%s任务: %s (%s -> %s)", operation, task_id, source_path, target_path)
+        
+        return {
+            'success': True,
+            'task_id': task_id,
+            'status': 'pending'
+        }
+    
+    def submit_copy_task(self, source_path: str, target_path: str, user_ip: str = None, user_agent: str = None,
+                         current_user: Dict[str, Any] = None) -> Dict[str, Any]:
+        """在后台复制文件或目录，立即返回任务ID"""
+        return self._submit_task('copy', self.copy_file, source_path, target_path, current_user,
+                                 user_ip=user_ip, user_agent=user_agent, progress={})
+    
+    def submit_move_task(self, source_path: str, target_path: str, user_ip: str = None, user_agent: str = None,
+                         current_user: Dict[str, Any] = None) -> Dict[str, Any]:
+        """在后台移动文件或目录，立即返回任务ID"""
+        return self._submit_task('move', self.move_file, source_path, target_path, current_user,
+                                 user_ip=user_ip, user_agent=user_agent)
+    
+    def get_task_status(self, task_id: str, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
+        """获取后台任务状态"""
+        owner = current_user['user_id'] if current_user else 'anonymous'
+        with _tasks_lock:
+            task = _tasks.get(task_id)
+            if not task or task['owner'] != owner:
+                return {
+                    'success': False,
+                    'message': '任务不存在或已过期'
+                }
+            status = {k: v for k, v in task.items() if k != 'owner'}
+        
+        if 'progress' in status:
+            status['progress'] = dict(status['progress'])
+        status['success'] = True
+        return status
+    
+    # ---- 异步接口：在线程中执行阻塞的文件系统调用，避免阻塞事件循环 ----
+    
+    async def list_directory_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """list_directory 的异步版本"""
+        return await asyncio.to_thread(self.list_directory, *args, **kwargs)
+    
+    async def get_file_info_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """get_file_info 的异步版本"""
+        return await asyncio.to_thread(self.get_file_info, *args, **kwargs)
+    
+    async def create_directory_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """create_directory 的异步版本"""
+        return await asyncio.to_thread(self.create_directory, *args, **kwargs)
+    
+    async def delete_file_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """delete_file 的异步版本"""
+        return await asyncio.to_thread(self.delete_file, *args, **kwargs)
+    
+    async def rename_file_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """rename_file 的异步版本"""
+        return await asyncio.to_thread(self.rename_file, *args, **kwargs)
+    
+    async def search_files_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """search_files 的异步版本"""
+        return await asyncio.to_thread(self.search_files, *args, **kwargs)
+    
+    async def move_file_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """move_file 的异步版本，大目录移动在专用IO线程池中执行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self.move_file, *args, **kwargs)
+        )
+    
+    async def copy_file_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """copy_file 的异步版本，大目录复制在专用IO线程池中执行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self.copy_file, *args, **kwargs)
+        )
+    
     def _invalidate_cache(self, file_path: str, current_user: Dict[str, Any] = None) -> None:
         """
         使相关缓存失效
+        
+        按路径索引精确清理：路径自身及其下级路径（目录被删除/重命名时）
+        和父目录的缓存，对所有用户生效，不影响其他目录的缓存。
         :param file_path: 文件路径
         :param current_user: 当前用户信息
         """
         try:
-            # 获取用户ID
             user_id = current_user['user_id'] if current_user else 'anonymous'
-            logger.info(f"开始清理缓存，文件路径: {file_path}, 用户ID: {user_id}")
+            logger.info("开始清理缓存，文件路径: %s, 用户ID: %s", file_path, user_id)
             
-            # 清理文件信息缓存
-            file_cache_key = f"file_info:{user_id}:{hashlib.md5(file_path.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(file_cache_key)
-            logger.info(f"清理文件信息缓存: {file_path} -> {file_cache_key}")
-            
-            # 清理父目录的目录列表缓存
             parent_dir = os.path.dirname(file_path) if file_path != '.' else '.'
             # 确保父目录路径格式与list_directory中的处理一致
             if parent_dir == "" or parent_dir == ".":
                 parent_dir = "."
             
-            dir_cache_key = f"dir_listing:{user_id}:{hashlib.md5(parent_dir.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(dir_cache_key)
-            logger.info(f"清理父目录缓存: {parent_dir} -> {dir_cache_key}")
-            
-            # 清理所有相关的目录列表缓存（使用模式匹配）
-            # 这确保清理所有可能的缓存变体
-            pattern = "dir_listing:*"
-            cleared_count = self.cache_service.clear_pattern(pattern)
-            logger.info(f"清理目录列表缓存模式: {pattern}, 清理了 {cleared_count} 个键")
+            # 进程内目录列表缓存：路径本身（可能是目录）及其父目录
+            _invalidate_listing(file_path, parent_dir)
             
-            # 清理所有文件信息缓存
-            file_pattern = "file_info:*"
-            cleared_file_count = self.cache_service.clear_pattern(file_pattern)
-            logger.info(f"清理文件信息缓存模式: {file_pattern}, 清理了 {cleared_file_count} 个键")
+            cleared_count = self.cache_service.invalidate_path(file_path)
+            cleared_count += self.cache_service.invalidate_path(parent_dir, subtree=False)
             
-            logger.info(f"缓存清理完成，文件路径: {file_path}")
+            logger.info("缓存清理完成，文件路径: %s, 清理了 %s 个键", file_path, cleared_count)
             
         except Exception as e:
-            logger.error(f"清理缓存失败: {file_path}, 错误: {e}")
+            logger.error("清理缓存失败: %s, 错误: %s", file_path, e)
     
-    def _cleanup_related_shares(self, file_path: str) -> None:
+    def _cleanup_related_shares(self, abs_file_path: str) -> None:
         """
         清理与源文件相关的共享文件
-        :param file_path: 源文件路径
+        :param abs_file_path: 源文件的绝对路径（由调用方解析）
         """
         try:
-            # 获取文件的绝对路径
-            abs_file_path = os.path.abspath(file_path)
-            
             # 查询数据库，找到所有指向该文件的共享记录
-            if self.mysql_service and self.mysql_service.is_connected():
-                sql = """
-                SELECT shared_file_path, owner_username 
-                FROM shared_files 
-                WHERE original_file_path = %s AND is_active = TRUE
-                """
-                shared_records = self.mysql_service.execute_query(sql, (abs_file_path,))
+            if self._db_available():
+                # 流式读取共享记录；通常只有0~1条，前_SHARE_REMOVE_INLINE_MAX个在当前线程直接删除，
+                # 更多的提交到共享的文件IO线程池，与后续读取重叠进行；删除任务不访问数据库
+                start = time.perf_counter()
+                removed = total = 0
+                futures = []
+                for records in self.mysql_service.execute_query_stream(_SHARED_RECORDS_SQL, (abs_file_path,)):
+                    for record in records:
+                        total += 1
+                        if total <= _SHARE_REMOVE_INLINE_MAX:
+                            removed += _remove_shared_file(record['shared_file_path'])
+                        else:
+                            futures.append(self._executor.submit(_remove_shared_file, record['shared_file_path']))
+                if not total:
+                    return
                 
-                # 清理每个共享文件
-                for record in shared_records:
-                    shared_path = record['shared_file_path']
-                    owner = record['owner_username']
-                    
-                    try:
-                        # 如果共享文件仍然存在，删除它
-                        if os.path.exists(shared_path):
-                            os.remove(shared_path)
-                            logger.info(f"删除共享文件: {shared_path}")
-                        
-                        # 更新数据库记录为非活跃状态
-                        update_sql = "UPDATE shared_files SET is_active = FALSE WHERE shared_file_path = %s"
-                        self.mysql_service.execute_update(update_sql, (shared_path,))
-                        logger.info(f"更新共享文件记录为非活跃状态: {shared_path}")
-                        
-                    except Exception as e:
-                        logger.error(f"清理共享文件失败: {shared_path}, 错误: {e}")
+                # 一条语句将所有相关共享记录更新为非活跃状态
+                updated = self.mysql_service.execute_update(_DEACTIVATE_SHARES_SQL, (abs_file_path,))
+                removed += sum(1 for future in futures if future.result())
+                logger.info("清理共享文件: %s, 删除 %s 个, 失败 %s 个, 停用记录 %s 条, 耗时 %.2fs",
+                            abs_file_path, removed, total - removed, updated,
+                            time.perf_counter() - start)
                         
         except Exception as e:
-            logger.error(f"清理相关共享文件失败: {e}")
+            logger.error("清理相关共享文件失败: %s", e)
@@ -5,26 +5,51 @@
 
 import os
 import time
+import uuid
+import queue
 import threading
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from typing import Dict, Any, Optional
 
-from core.config import Config
+from core.config import config
 from services.mysql_service import get_mysql_service
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 日志清理和表优化的执行间隔（秒），按单调时钟计算，不受系统时间调整影响
+_CLEANUP_INTERVAL = 24 * 3600
+_OPTIMIZE_INTERVAL = 7 * 24 * 3600
+# 两次检查之间的最短等待时间（秒），任务失败（上次执行时间未更新）时按此间隔重试
+_MIN_WAIT_SECONDS = 300
+# 多实例部署时用MySQL命名锁保证同一任务同时只在一个实例上执行
+_CLEANUP_LOCK = 'file_manager:log_cleanup'
+_OPTIMIZE_LOCK = 'file_manager:log_optimize'
+# 保留的手动维护任务状态条数
+_MAX_JOBS = 100
+
 class LogMaintenanceService:
     """日志维护服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.mysql_service = None
         self.maintenance_thread = None
         self.running = False
+        self._stop_event = threading.Event()
+        # 保证running检查与线程启动/停止的原子性
+        self._state_lock = threading.Lock()
+        # last_cleanup/last_optimize仅用于状态展示，调度使用单调时钟记录的时间
         self.last_cleanup = None
         self.last_optimize = None
+        self._last_cleanup_mono: Optional[float] = None
+        self._last_optimize_mono: Optional[float] = None
+        self._retention = self._load_retention_config()
+        # 手动维护任务：请求只入队，由维护线程执行；job_id -> 任务状态
+        self._jobs: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._job_status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
         
         # 初始化MySQL服务
         try:
@@ -32,9 +57,25 @@ class LogMaintenanceService:
         except Exception as e:
             logger.error(f"初始化日志维护服务失败: {e}")
     
+    def _load_retention_config(self) -> Dict[str, Any]:
+        """读取mysql.maintenance配置并补齐默认值，兼容配置文件中的log_retention_days写法"""
+        maintenance = self.config.MYSQL_LOG_RETENTION or {}
+        return {
+            'enabled': maintenance.get('enabled', maintenance.get('auto_cleanup', True)),
+            'retention_days': maintenance.get('retention_days', maintenance.get('log_retention_days', 30)),
+            'auto_cleanup': maintenance.get('auto_cleanup', True),
+            'max_records': maintenance.get('max_records'),
+            'optimize_threshold': maintenance.get('optimize_threshold', 0.2),
+            'partition_logs': maintenance.get('partition_logs', False),
+        }
+    
+    def reload_config(self):
+        """重新读取日志维护配置"""
+        self._retention = self._load_retention_config()
+    
     def start_auto_maintenance(self):
         """启动自动维护服务"""
-        if not self.config.MYSQL_LOG_RETENTION['enabled']:
+        if not self._retention['enabled']:
             logger.info("日志自动维护已禁用")
             return False
         
@@ -42,35 +83,57 @@ class LogMaintenanceService:
             logger.error("MySQL服务不可用，无法启动自动维护")
             return False
         
-        if self.running:
-            logger.info("自动维护服务已在运行")
-            return True
-        
-        try:
-            self.running = True
-            self.maintenance_thread = threading.Thread(
-                target=self._maintenance_worker,
-                daemon=True,
-                name="LogMaintenanceWorker"
-            )
-            self.maintenance_thread.start()
-            
-            logger.info("日志自动维护服务已启动")
-            return True
+        with self._state_lock:
+            if self.running:
+                logger.info("自动维护服务已在运行")
+                return True
+            if self.maintenance_thread and self.maintenance_thread.is_alive():
+                logger.info("上一个维护工作线程仍在停止中，暂不能启动")
+                return False
             
-        except Exception as e:
-            logger.error(f"启动自动维护服务失败: {e}")
-            self.running = False
-            return False
+            try:
+                self.running = True
+                self._stop_event.clear()
+                self.maintenance_thread = threading.Thread(
+                    target=self._maintenance_worker,
+                    daemon=True,
+                    name="LogMaintenanceWorker"
+                )
+                self.maintenance_thread.start()
+                
+                logger.info("日志自动维护服务已启动")
+                return True
+                
+            except Exception as e:
+                logger.error(f"启动自动维护服务失败: {e}")
+                self.running = False
+                return False
     
     def stop_auto_maintenance(self):
         """停止自动维护服务"""
-        if not self.running:
-            return
+        with self._state_lock:
+            if not self.running:
+                return
+            
+            self.running = False
+            # 唤醒正在等待的工作线程，使其立即退出
+            self._stop_event.set()
+            self._jobs.put(None)
+            thread = self.maintenance_thread
         
-        self.running = False
-        if self.maintenance_thread:
-            self.maintenance_thread.join(timeout=5)
+        # 在锁外等待工作线程退出，期间提交的手动任务不会被阻塞（改由单独线程执行）；
+        # 正在执行的清理会在当前批次结束后响应停止信号
+        if thread:
+            thread.join()
+        
+        # 工作线程已退出，仍在队列中的手动任务不会再执行，标记为失败
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._abandon_job(job)
         
         logger.info("日志自动维护服务已停止")
     
@@ -80,50 +143,100 @@ class LogMaintenanceService:
         
         while self.running:
             try:
-                current_time = datetime.now()
+                current_time = time.monotonic()
                 
                 # 检查是否需要清理日志
                 if self._should_cleanup_logs(current_time):
-                    self._perform_log_cleanup()
+                    if not self._run_exclusive(_CLEANUP_LOCK, self._perform_log_cleanup):
+                        # 其他实例正在执行，本实例按正常周期推迟到下一次
+                        self._mark_cleanup()
                 
                 # 检查是否需要优化表
                 if self._should_optimize_table(current_time):
-                    self._perform_table_optimization()
+                    if not self._run_exclusive(_OPTIMIZE_LOCK, self._perform_table_optimization):
+                        self._mark_optimize()
                 
-                # 休眠1小时
-                time.sleep(3600)
+                # 一直等到下一个任务到期或有手动任务入队；停止服务时放入None，立即返回
+                wait_seconds = self._seconds_until_next_task(time.monotonic())
                 
             except Exception as e:
                 logger.error(f"维护工作线程执行失败: {e}")
-                time.sleep(300)  # 出错后等待5分钟再重试
+                wait_seconds = 300  # 出错后等待5分钟再重试
+            
+            try:
+                job = self._jobs.get(timeout=wait_seconds)
+            except queue.Empty:
+                job = None
+            if self._stop_event.is_set():
+                if job is not None:
+                    self._abandon_job(job)
+                break
+            if job is not None:
+                self._run_job(job)
         
         logger.info("日志维护工作线程已退出")
     
-    def _should_cleanup_logs(self, current_time: datetime) -> bool:
+    def _run_exclusive(self, lock_name: str, task) -> bool:
+        """持有命名锁执行任务，返回是否在本实例执行；锁被其他实例持有时跳过"""
+        with self.mysql_service.advisory_lock(lock_name) as acquired:
+            if acquired:
+                task()
+                return True
+        logger.info(f"维护任务{lock_name}正由其他实例执行，本周期跳过")
+        return False
+    
+    def _mark_cleanup(self):
+        """记录一次日志清理完成"""
+        self._last_cleanup_mono = time.monotonic()
+        self.last_cleanup = datetime.now()
+    
+    def _mark_optimize(self):
+        """记录一次表优化完成"""
+        self._last_optimize_mono = time.monotonic()
+        self.last_optimize = datetime.now()
+    
+    def _seconds_until_next_task(self, current_time: float) -> float:
+        """距离下一次清理或优化到期的秒数，不小于_MIN_WAIT_SECONDS；current_time为time.monotonic()"""
+        next_cleanup = (self._last_cleanup_mono + _CLEANUP_INTERVAL) if self._last_cleanup_mono is not None else current_time
+        next_optimize = (self._last_optimize_mono + _OPTIMIZE_INTERVAL) if self._last_optimize_mono is not None else current_time
+        seconds = min(next_cleanup, next_optimize) - current_time
+        return max(_MIN_WAIT_SECONDS, seconds)
+    
+    def _should_cleanup_logs(self, current_time: float) -> bool:
         """检查是否需要清理日志"""
         # 如果从未清理过，或者距离上次清理超过24小时
-        if not self.last_cleanup:
+        if self._last_cleanup_mono is None:
             return True
         
-        time_since_last_cleanup = current_time - self.last_cleanup
-        return time_since_last_cleanup.total_seconds() >= 24 * 3600  # 24小时
+        return current_time - self._last_cleanup_mono >= _CLEANUP_INTERVAL
     
-    def _should_optimize_table(self, current_time: datetime) -> bool:
+    def _should_optimize_table(self, current_time: float) -> bool:
         """检查是否需要优化表"""
         # 如果从未优化过，或者距离上次优化超过7天
-        if not self.last_optimize:
+        if self._last_optimize_mono is None:
             return True
         
-        time_since_last_optimize = current_time - self.last_optimize
-        return time_since_last_optimize.total_seconds() >= 7 * 24 * 3600  # 7天
+        return current_time - self._last_optimize_mono >= _OPTIMIZE_INTERVAL
+    
+    def _drop_expired_partitions(self, retention_days: int):
+        """启用日志表分区时，先整分区删除过期数据并预建后续分区"""
+        if not self._retention['partition_logs']:
+            return
+        try:
+            self.mysql_service.ensure_log_partitions()
+            self.mysql_service.drop_expired_log_partitions(retention_days)
+        except Exception as e:
+            # 分区维护失败时仍由按批删除完成清理
+            logger.error(f"日志分区维护失败: {e}")
     
     def _perform_log_cleanup(self):
         """执行日志清理"""
         try:
-            retention_days = self.config.MYSQL_LOG_RETENTION['retention_days']
+            retention_days = self._retention['retention_days']
             logger.info(f"开始自动清理超过{retention_days}天的操作日志")
             
-            cleanup_result = self.mysql_service.cleanup_old_logs(retention_days)
+            self._drop_expired_partitions(retention_days)
+            cleanup_result = self.mysql_service.cleanup_old_logs(retention_days, stop_event=self._stop_event)
             
             if cleanup_result.get('success'):
                 deleted_count = cleanup_result.get('deleted_count', 0)
@@ -132,7 +245,7 @@ class LogMaintenanceService:
                 else:
                     logger.info("自动清理完成: 没有需要清理的日志")
                 
-                self.last_cleanup = datetime.now()
+                self._mark_cleanup()
             else:
                 logger.error(f"自动清理失败: {cleanup_result.get('message')}")
                 
@@ -144,7 +257,7 @@ class LogMaintenanceService:
         try:
             logger.info("开始自动优化日志表")
             
-            optimize_result = self.mysql_service.optimize_log_table()
+            optimize_result = self.mysql_service.optimize_log_table(self._retention['optimize_threshold'])
             
             if optimize_result.get('success'):
                 fragmented_space = optimize_result.get('fragmented_space_mb', 0)
@@ -153,25 +266,105 @@ class LogMaintenanceService:
                 else:
                     logger.info("表优化完成: 没有碎片需要清理")
                 
-                self.last_optimize = datetime.now()
+                self._mark_optimize()
             else:
                 logger.error(f"表优化失败: {optimize_result.get('message')}")
                 
         except Exception as e:
             logger.error(f"执行表优化失败: {e}")
     
+    def _submit_job(self, job_type: str, **params) -> Dict[str, Any]:
+        """提交手动维护任务并立即返回任务ID；相同的任务已在排队或执行时直接返回该任务"""
+        with self._jobs_lock:
+            for job in self._job_status.values():
+                if job['type'] == job_type and job['params'] == params and job['status'] in ('queued', 'running'):
+                    return {'success': True, 'job_id': job['job_id'], 'status': job['status']}
+            
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'type': job_type,
+                'params': params,
+                'status': 'queued',
+                'result': None,
+                'created_at': datetime.now().isoformat(),
+                'finished_at': None
+            }
+            self._job_status[job['job_id']] = job
+            while len(self._job_status) > _MAX_JOBS:
+                self._job_status.popitem(last=False)
+        
+        # 与stop_auto_maintenance互斥，避免任务排在停止信号之后而永远不被执行
+        with self._state_lock:
+            queued = self.running
+            if queued:
+                self._jobs.put(job)
+        if not queued:
+            # 自动维护未启动时没有维护线程，单独起一个后台线程执行
+            threading.Thread(target=self._run_job, args=(job,), daemon=True,
+                             name="LogMaintenanceJob").start()
+        
+        return {'success': True, 'job_id': job['job_id'], 'status': job['status']}
+    
+    def _run_job(self, job: Dict[str, Any]):
+        """执行手动维护任务，与自动维护共用命名锁，其他实例正在执行时本任务失败"""
+        with self._jobs_lock:
+            job['status'] = 'running'
+        
+        if job['type'] == 'cleanup':
+            lock_name, task = _CLEANUP_LOCK, lambda: self._manual_cleanup_now(**job['params'])
+        else:
+            lock_name, task = _OPTIMIZE_LOCK, self._manual_optimize_now
+        
+        try:
+            with self.mysql_service.advisory_lock(lock_name) as acquired:
+                if acquired:
+                    result = task()
+                else:
+                    result = {'success': False, 'message': '该维护任务正由其他实例执行'}
+        except Exception as e:
+            logger.error(f"执行手动维护任务失败: {e}")
+            result = {'success': False, 'message': str(e)}
+        
+        with self._jobs_lock:
+            job['result'] = result
+            job['status'] = 'completed' if result.get('success') else 'failed'
+            job['finished_at'] = datetime.now().isoformat()
+    
+    def _abandon_job(self, job: Dict[str, Any]):
+        """维护服务停止时未执行的任务标记为失败"""
+        with self._jobs_lock:
+            job['result'] = {'success': False, 'message': '维护服务已停止，任务未执行'}
+            job['status'] = 'failed'
+            job['finished_at'] = datetime.now().isoformat()
+    
+    def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取手动维护任务状态，不存在时返回None"""
+        with self._jobs_lock:
+            job = self._job_status.get(job_id)
+            return dict(job) if job else None
+    
     def manual_cleanup(self, retention_days: Optional[int] = None) -> Dict[str, Any]:
-        """手动清理日志"""
+        """手动清理日志（异步执行，返回任务ID）"""
+        if not retention_days:
+            retention_days = self._retention['retention_days']
+        return self._submit_job('cleanup', retention_days=retention_days)
+    
+    def manual_optimize(self) -> Dict[str, Any]:
+        """手动优化表（异步执行，返回任务ID）"""
+        return self._submit_job('optimize')
+    
+    def _manual_cleanup_now(self, retention_days: int) -> Dict[str, Any]:
+        """执行手动清理日志"""
         try:
-            if not retention_days:
-                retention_days = self.config.MYSQL_LOG_RETENTION['retention_days']
-            
             logger.info(f"开始手动清理超过{retention_days}天的操作日志")
             
-            cleanup_result = self.mysql_service.cleanup_old_logs(retention_days)
+            self._drop_expired_partitions(retention_days)
+            # 只有在维护线程中执行时才响应停止信号；单独线程执行的任务不受服务启停影响
+            stop_event = self._stop_event if threading.current_thread() is self.maintenance_thread else None
+            cleanup_result = self.mysql_service.cleanup_old_logs(retention_days, stop_event=stop_event)
             
             if cleanup_result.get('success'):
-                self.last_cleanup = datetime.now()
+                self._mark_cleanup()
                 logger.info("手动清理完成")
             else:
                 logger.error(f"手动清理失败: {cleanup_result.get('message')}")
@@ -185,15 +378,15 @@ class LogMaintenanceService:
                 'message': str(e)
             }
     
-    def manual_optimize(self) -> Dict[str, Any]:
-        """手动优化表"""
+    def _manual_optimize_now(self) -> Dict[str, Any]:
+        """执行手动优化表"""
         try:
             logger.info("开始手动优化日志表")
             
             optimize_result = self.mysql_service.optimize_log_table()
             
             if optimize_result.get('success'):
-                self.last_optimize = datetime.now()
+                self._mark_optimize()
                 logger.info("手动优化完成")
             else:
                 logger.error(f"手动优化失败: {optimize_result.get('message')}")
@@ -214,10 +407,10 @@ class LogMaintenanceService:
             'last_cleanup': self.last_cleanup.isoformat() if self.last_cleanup else None,
             'last_optimize': self.last_optimize.isoformat() if self.last_optimize else None,
             'config': {
-                'enabled': self.config.MYSQL_LOG_RETENTION['enabled'],
-                'retention_days': self.config.MYSQL_LOG_RETENTION['retention_days'],
-                'auto_cleanup': self.config.MYSQL_LOG_RETENTION['auto_cleanup'],
-                'max_records': self.config.MYSQL_LOG_RETENTION['max_records']
+                'enabled': self._retention['enabled'],
+                'retention_days': self._retention['retention_days'],
+                'auto_cleanup': self._retention['auto_cleanup'],
+                'max_records': self._retention['max_records']
             }
         }
     
@@ -233,12 +426,16 @@ class LogMaintenanceService:
 
 # 全局日志维护服务实例
 _log_maintenance_service = None
+_log_maintenance_service_lock = threading.Lock()
 
 def get_log_maintenance_service() -> LogMaintenanceService:
     """获取日志维护服务实例"""
     global _log_maintenance_service
     if _log_maintenance_service is None:
-        _log_maintenance_service = LogMaintenanceService()
+        # 双重检查，避免并发首次调用时创建多个实例和多个维护线程
+        with _log_maintenance_service_lock:
+            if _log_maintenance_service is None:
+                _log_maintenance_service = LogMaintenanceService()
     return _log_maintenance_service
 
 def start_log_maintenance():
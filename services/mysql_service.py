@@ -4,137 +4,314 @@ MySQL数据库服务
 """
 
 import os
+import re
 import sys
 import time
-from typing import Optional, Dict, Any, List, Tuple
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Iterator
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
+# 优先使用C实现的mysqlclient（结果集解析比纯Python的PyMySQL快数倍），未安装时使用PyMySQL；
+# 两者都遵循DB-API 2.0，下面只在建立连接的参数名上有差别
 try:
-    import pymysql
-    from pymysql.cursors import DictCursor
-    from pymysql.err import OperationalError, ProgrammingError, IntegrityError
+    import MySQLdb as db_driver
+    from MySQLdb.cursors import DictCursor, SSDictCursor
+    _DRIVER_NAME = 'mysqlclient'
 except ImportError:
-    pymysql = None
-    print("警告: PyMySQL未安装，MySQL功能将不可用")
+    try:
+        import pymysql as db_driver
+        from pymysql.cursors import DictCursor, SSDictCursor
+        _DRIVER_NAME = 'pymysql'
+    except ImportError:
+        db_driver = None
+        _DRIVER_NAME = None
+        print("警告: PyMySQL未安装，MySQL功能将不可用")
 
-from core.config import Config
+# 空闲连接回收线程的检查间隔（秒）
+_IDLE_REAP_INTERVAL = 30
+
+# 表示连接本身已失效的异常，发生后连接不再放回连接池
+_CONNECTION_ERRORS = (db_driver.OperationalError, db_driver.InterfaceError) if db_driver else ()
+
+from core.config import config
 from utils.logger import get_logger
+from utils.batch_writer import BatchWriter
 
 logger = get_logger(__name__)
 
+# 连接探测成功结果的缓存时间（秒）；失败结果不缓存，数据库恢复后立即可见
+_CONNECTED_TTL = 5.0
+
+# 数据库时钟偏移的重新校准间隔（秒）
+_CLOCK_SYNC_INTERVAL = 3600
+
+# 判断是否为INSERT语句；只匹配开头，不复制整条SQL
+_INSERT_RE = re.compile(r'\s*INSERT\b', re.IGNORECASE)
+
+# 高频写入语句只定义一次，所有调用共享同一语句文本。
+# PyMySQL不支持服务端预处理语句；对这种单个VALUES元组的INSERT，
+# cursor.executemany会自动改写为一条多行VALUES语句，批量写入只需一次往返。
+_FILE_OPERATION_INSERT_SQL = """
+INSERT INTO file_operations 
+(operation_type, file_path, file_name, file_size, user_ip, user_agent, status, error_message, duration_ms)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+_FILE_INFO_UPSERT_SQL = """
+INSERT INTO files 
+(file_path, file_name, file_size, file_type, mime_type, hash_value, 
+ is_directory, parent_path, owner)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+file_size = VALUES(file_size),
+modified_time = CURRENT_TIMESTAMP
+"""
+
+_FILE_INFO_RENAME_SQL = """
+UPDATE files
+SET file_path = %s, file_name = %s, parent_path = %s, file_type = %s, mime_type = %s
+WHERE file_path = %s
+"""
+
+# 目录改名时替换其下所有记录的路径前缀：新前缀 + 旧前缀之后的部分
+_FILE_INFO_RENAME_CHILDREN_SQL = """
+UPDATE files
+SET file_path = CONCAT(%s, SUBSTRING(file_path, %s)),
+    parent_path = CONCAT(%s, SUBSTRING(parent_path, %s))
+WHERE file_path LIKE %s
+"""
+
 class MySQLService:
     """MySQL数据库服务类"""
     
     def __init__(self):
-        self.config = Config()
-        self.connection_pool = []
-        self.max_connections = 20
-        self.min_connections = 5
+        self.config = config
+        pool_config = self.config.MYSQL_POOL_CONFIG
+        # 空闲连接，后进先出：总是借出最近归还的连接（服务端缓存较热），
+        # 流量下降后多余的连接在左端闲置并被回收；借出的连接不在其中
+        self.connection_pool = deque()
+        self.max_connections = pool_config.get('max_connections', 20)
+        self.min_connections = pool_config.get('min_connections', 5)
+        # 连接池满时等待空闲连接的最长时间（秒）
+        self.pool_timeout = pool_config.get('pool_timeout', 30)
+        # 连接存活超过pool_recycle秒后关闭重建，避免被服务端wait_timeout断开；
+        # 开启pool_pre_ping时，空闲超过ping_idle_seconds秒的连接在借出前ping一次
+        self.pool_recycle = pool_config.get('pool_recycle', 3600)
+        self.pool_pre_ping = pool_config.get('pool_pre_ping', True)
+        self.ping_idle_seconds = pool_config.get('ping_idle_seconds', 60)
+        # 空闲超过idle_timeout秒的连接被关闭，但至少保留min_connections个
+        self.idle_timeout = pool_config.get('idle_timeout', 300)
+        self._reaper_stop = threading.Event()
+        self._pool_lock = threading.Lock()
+        # 每个借出的连接占用一个名额，同时打开的连接总数不超过max_connections
+        self._pool_slots = threading.BoundedSemaphore(self.max_connections)
+        # 操作日志写入器：调用方只入队，后台线程攒批后用一条多行INSERT写入
+        self._op_log_writer = BatchWriter("FileOpLogWriter")
+        # 最近一次连接探测成功的时间（time.monotonic()）
+        self._connected_at = float('-inf')
+        # 数据库时钟相对本机时钟的偏移，get_current_time据此换算，不必每次查询
+        self._db_clock_offset = timedelta(0)
+        self._clock_synced_at = float('-inf')
+        # 校准时本机的UTC偏移；夏令时切换后本机时间跳变，偏移需立即重新校准
+        self._clock_utcoffset = None
+        # 连接在握手时即设置autocommit；开启时单条语句由服务端自动提交，无需再发COMMIT/ROLLBACK
+        self._autocommit = bool(self.config.MYSQL_OPTIONS.get('autocommit', True))
+        self._connect_kwargs = self._build_connect_kwargs() if db_driver else {}
         self._initialize_pool()
     
     def _initialize_pool(self):
         """初始化连接池"""
-        if not pymysql:
+        if not db_driver:
             logger.error("PyMySQL未安装，无法初始化MySQL连接池")
             return
         
         try:
+            self._apply_isolation_level()
+            
             # 创建初始连接
             for _ in range(self.min_connections):
                 conn = self._create_connection()
                 if conn:
                     self.connection_pool.append(conn)
             
-            logger.info(f"MySQL连接池初始化完成，当前连接数: {len(self.connection_pool)}")
+            logger.info("MySQL连接池初始化完成（驱动: %s），当前连接数: %s", _DRIVER_NAME, len(self.connection_pool))
+            
+            threading.Thread(target=self._reap_idle_connections, daemon=True,
+                             name="MySQLIdleReaper").start()
+        except Exception as e:
+            logger.error("MySQL连接池初始化失败: %s", e)
+    
+    def _apply_isolation_level(self):
+        """把配置的事务隔离级别加入init_command
+        
+        隔离级别的会话变量在MySQL 5.7.20/MariaDB 11.1之前名为tx_isolation，之后为transaction_isolation；
+        写错变量名会使init_command失败、所有连接都建立不起来，因此先用一个不含该变量的连接探测一次
+        """
+        options = self.config.MYSQL_OPTIONS
+        if not options.get('isolation_level'):
+            return
+        
+        conn = self._create_connection()
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SHOW VARIABLES LIKE 'transaction_isolation'")
+                variable = 'transaction_isolation' if cursor.fetchone() else 'tx_isolation'
+            self._connect_kwargs['init_command'] = self._build_init_command(options, variable)
         except Exception as e:
-            logger.error(f"MySQL连接池初始化失败: {e}")
+            logger.error("探测事务隔离级别变量失败，沿用服务器默认隔离级别: %s", e)
+        finally:
+            self._close_quietly(conn)
+    
+    def _build_connect_kwargs(self) -> Dict[str, Any]:
+        """由配置生成建立连接的参数，只在初始化时计算一次"""
+        options = self.config.MYSQL_OPTIONS
+        kwargs = {
+            'host': self.config.MYSQL_HOST,
+            'port': self.config.MYSQL_PORT,
+            'user': self.config.MYSQL_USERNAME,
+            'charset': self.config.MYSQL_CHARSET,
+            'use_unicode': True,
+            'cursorclass': DictCursor,
+            # autocommit并入init_command，驱动不再在握手后单独发送SET autocommit
+            'autocommit': None,
+            'init_command': self._build_init_command(options),
+            'connect_timeout': options['connect_timeout'],
+            'read_timeout': options['read_timeout'],
+            'write_timeout': options['write_timeout'],
+        }
+        if _DRIVER_NAME == 'mysqlclient':
+            kwargs.update(passwd=self.config.MYSQL_PASSWORD, db=self.config.MYSQL_DATABASE)
+        else:
+            kwargs.update(password=self.config.MYSQL_PASSWORD, database=self.config.MYSQL_DATABASE)
+        return kwargs
+    
+    @staticmethod
+    def _build_init_command(options: Dict[str, Any], isolation_variable: Optional[str] = None) -> str:
+        """把会话变量合并为一条SET，在建立连接时随握手一次性执行
+        
+        未配置time_zone时沿用服务器时区：DATETIME列的CURRENT_TIMESTAMP默认值
+        需要与应用端datetime.now()保持同一时区。
+        isolation_variable为探测到的隔离级别变量名，未给出时不设置隔离级别
+        """
+        assignments = [f"autocommit={1 if options.get('autocommit', True) else 0}"]
+        if options.get('time_zone'):
+            assignments.append(f"time_zone='{options['time_zone']}'")
+        if options.get('sql_mode'):
+            assignments.append(f"sql_mode='{options['sql_mode']}'")
+        isolation = options.get('isolation_level')
+        if isolation and isolation_variable:
+            assignments.append(f"SESSION {isolation_variable}='{isolation.upper().replace('_', '-')}'")
+        return "SET " + ", ".join(assignments)
     
-    def _create_connection(self) -> Optional[pymysql.Connection]:
+    def _create_connection(self) -> Optional[Any]:
         """创建新的数据库连接"""
         try:
-            # 从配置文件获取MySQL配置
-            logger.info(f"尝试创建MySQL连接: {self.config.MYSQL_HOST}:{self.config.MYSQL_PORT}")
+            logger.info("尝试创建MySQL连接: %s:%s", self.config.MYSQL_HOST, self.config.MYSQL_PORT)
             
-            connection = pymysql.connect(
-                host=self.config.MYSQL_HOST,
-                port=self.config.MYSQL_PORT,
-                user=self.config.MYSQL_USERNAME,
-                password=self.config.MYSQL_PASSWORD,
-                database=self.config.MYSQL_DATABASE,
-                charset=self.config.MYSQL_CHARSET,
-                cursorclass=DictCursor,
-                autocommit=self.config.MYSQL_OPTIONS['autocommit'],
-                connect_timeout=self.config.MYSQL_OPTIONS['connect_timeout'],
-                read_timeout=self.config.MYSQL_OPTIONS['read_timeout'],
-                write_timeout=self.config.MYSQL_OPTIONS['write_timeout']
-            )
-            
-            # 测试连接
-            connection.ping(reconnect=False)
+            connection = db_driver.connect(**self._connect_kwargs)
+            connection._pool_created_at = connection._pool_last_used = time.monotonic()
             logger.info("MySQL连接创建成功")
             return connection
             
         except Exception as e:
-            logger.error(f"创建MySQL连接失败: {e}")
+            logger.error("创建MySQL连接失败: %s", e)
             return None
     
-    def _get_connection(self) -> Optional[pymysql.Connection]:
-        """从连接池获取连接"""
+    def _get_connection(self) -> Optional[Any]:
+        """从连接池获取连接，连接数已达上限时最多等待pool_timeout秒"""
+        if not self._pool_slots.acquire(timeout=self.pool_timeout):
+            logger.error("等待数据库连接超时（%s秒），连接数已达上限%s", self.pool_timeout, self.max_connections)
+            return None
+        
+        conn = None
         try:
-            if not self.connection_pool:
-                # 如果连接池为空，创建新连接
-                conn = self._create_connection()
-                if conn:
-                    return conn
-                # 如果创建失败，尝试再次创建
-                conn = self._create_connection()
-                if conn:
-                    return conn
-                logger.error("无法创建数据库连接")
-                return None
-            
             # 从连接池获取连接
-            conn = self.connection_pool.pop()
+            with self._pool_lock:
+                if self.connection_pool:
+                    conn = self.connection_pool.pop()
             
-            # 检查连接是否有效
-            try:
-                conn.ping(reconnect=False)
-                return conn
-            except Exception:
-                # 连接无效，关闭并创建新连接
-                try:
-                    conn.close()
-                except:
-                    pass
-                conn = self._create_connection()
-                if conn:
-                    return conn
-                # 如果创建失败，尝试再次创建
-                conn = self._create_connection()
-                return conn
+            if conn is not None:
+                now = time.monotonic()
+                if now - conn._pool_created_at > self.pool_recycle:
+                    # 连接已超过最长存活时间，关闭并创建新连接
+                    self._close_quietly(conn)
+                    conn = None
+                elif self.pool_pre_ping and now - conn._pool_last_used > self.ping_idle_seconds:
+                    # 空闲较久的连接可能已被服务端断开，检查是否有效
+                    # （mysqlclient的ping只接受位置参数）
+                    try:
+                        conn.ping(False)
+                    except Exception:
+                        self._close_quietly(conn)
+                        conn = None
+            
+            if conn is None:
+                # 连接池为空或连接已失效，创建新连接；失败时再尝试一次
+                conn = self._create_connection() or self._create_connection()
+                if conn is None:
+                    logger.error("无法创建数据库连接")
+            return conn
         except Exception as e:
-            logger.error(f"获取数据库连接失败: {e}")
+            logger.error("获取数据库连接失败: %s", e)
+            conn = None
             return None
+        finally:
+            if conn is None:
+                self._pool_slots.release()
     
-    def _return_connection(self, conn: pymysql.Connection):
-        """将连接返回到连接池"""
-        if conn and len(self.connection_pool) < self.max_connections:
-            try:
-                # 检查连接是否有效
-                conn.ping(reconnect=False)
-                self.connection_pool.append(conn)
-            except Exception:
-                # 连接无效，关闭它
-                try:
-                    conn.close()
-                except:
-                    pass
+    def _reap_idle_connections(self):
+        """定期关闭空闲过久的连接；LIFO下最久未用的连接总在左端"""
+        while not self._reaper_stop.wait(_IDLE_REAP_INTERVAL):
+            expired = []
+            deadline = time.monotonic() - self.idle_timeout
+            with self._pool_lock:
+                pool = self.connection_pool
+                while len(pool) > self.min_connections and pool[0]._pool_last_used < deadline:
+                    expired.append(pool.popleft())
+            for conn in expired:
+                self._close_quietly(conn)
+            if expired:
+                logger.debug("关闭了%s个空闲MySQL连接", len(expired))
+    
+    @staticmethod
+    def _close_quietly(conn):
+        """关闭连接，忽略错误"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _return_connection(self, conn, discard: bool = False):
+        """将连接返回到连接池，并归还其占用的名额
+        
+        归还时不再ping：使用中出现连接错误时由调用方传入discard丢弃，
+        空闲较久的连接在下次借出前检查
+        """
+        try:
+            now = time.monotonic()
+            if not discard and now - conn._pool_created_at <= self.pool_recycle:
+                conn._pool_last_used = now
+                with self._pool_lock:
+                    if len(self.connection_pool) < self.max_connections:
+                        self.connection_pool.append(conn)
+                        conn = None
+        finally:
+            self._pool_slots.release()
+        
+        if conn is not None:
+            # 连接已失效、超过存活时间或空闲连接已满，关闭它
+            self._close_quietly(conn)
     
     @contextmanager
     def get_connection(self):
         """获取数据库连接的上下文管理器"""
         conn = None
+        discard = False
         try:
             conn = self._get_connection()
             if conn:
@@ -142,11 +319,31 @@ class MySQLService:
             else:
                 raise Exception("无法获取数据库连接")
         except Exception as e:
-            logger.error(f"数据库操作失败: {e}")
+            discard = isinstance(e, _CONNECTION_ERRORS)
+            logger.error("数据库操作失败: %s", e)
             raise
         finally:
             if conn:
-                self._return_connection(conn)
+                self._return_connection(conn, discard)
+    
+    @contextmanager
+    def advisory_lock(self, name: str, timeout: int = 0):
+        """获取MySQL命名锁（GET_LOCK），产出是否获得锁
+        
+        命名锁属于会话，持锁期间独占一个连接，退出时在同一连接上释放；
+        多个进程/实例间同一时刻只有一个能获得锁
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (name, timeout))
+                row = cursor.fetchone()
+                acquired = bool(row and row['acquired'] == 1)
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                        cursor.fetchall()
     
     def execute_query(self, sql: str, params: tuple = None) -> List[Dict[str, Any]]:
         """执行查询语句"""
@@ -155,10 +352,29 @@ class MySQLService:
                 try:
                     cursor.execute(sql, params)
                     result = cursor.fetchall()
-                    logger.debug(f"执行查询成功: {sql}, 参数: {params}, 结果行数: {len(result)}")
+                    logger.debug("执行查询成功: %s, 参数: %s, 结果行数: %s", sql, params, len(result))
                     return result
                 except Exception as e:
-                    logger.error(f"查询执行失败: {sql}, 参数: {params}, 错误: {e}")
+                    logger.error("查询执行失败: %s, 参数: %s, 错误: %s", sql, params, e)
+                    raise
+    
+    def execute_query_stream(self, sql: str, params: tuple = None,
+                             chunk_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """流式执行查询，每次产出最多chunk_size行
+        
+        使用服务端游标，结果集不会整体载入内存；迭代期间独占一个连接，调用方应尽快消费完
+        """
+        with self.get_connection() as conn:
+            with conn.cursor(SSDictCursor) as cursor:
+                try:
+                    cursor.execute(sql, params)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+                except Exception as e:
+                    logger.error("流式查询执行失败: %s, 参数: %s, 错误: %s", sql, params, e)
                     raise
     
     def execute_update(self, sql: str, params: tuple = None) -> int:
@@ -166,25 +382,28 @@ class MySQLService:
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 try:
-                    # 添加调试日志
-                    logger.info(f"执行SQL: {sql}")
-                    logger.info(f"参数: {params}")
+                    # 调试日志：每条语句都会执行到这里，只在DEBUG级别输出
+                    logger.debug("执行SQL: %s", sql)
+                    logger.debug("参数: %s", params)
                     
                     affected_rows = cursor.execute(sql, params)
                     
                     # 如果是INSERT语句，获取插入后的主键ID
-                    if sql.strip().upper().startswith('INSERT'):
+                    if _INSERT_RE.match(sql):
                         last_insert_id = cursor.lastrowid
-                        conn.commit()
-                        logger.info(f"执行插入成功: {sql}, 参数: {params}, 影响行数: {affected_rows}, 插入ID: {last_insert_id}")
+                        if not self._autocommit:
+                            conn.commit()
+                        logger.debug("执行插入成功: %s, 参数: %s, 影响行数: %s, 插入ID: %s", sql, params, affected_rows, last_insert_id)
                         return last_insert_id
                     else:
-                        conn.commit()
-                        logger.info(f"执行更新成功: {sql}, 参数: {params}, 影响行数: {affected_rows}")
+                        if not self._autocommit:
+                            conn.commit()
+                        logger.debug("执行更新成功: %s, 参数: %s, 影响行数: %s", sql, params, affected_rows)
                         return affected_rows
                 except Exception as e:
-                    conn.rollback()
-                    logger.error(f"更新执行失败: {sql}, 参数: {params}, 错误: {e}")
+                    if not self._autocommit:
+                        conn.rollback()
+                    logger.error("更新执行失败: %s, 参数: %s, 错误: %s", sql, params, e)
                     raise
     
     def execute_many(self, sql: str, params_list: List[tuple]) -> int:
@@ -193,12 +412,31 @@ class MySQLService:
             with conn.cursor() as cursor:
                 try:
                     affected_rows = cursor.executemany(sql, params_list)
-                    conn.commit()
-                    logger.debug(f"批量执行成功: {sql}, 参数数量: {len(params_list)}, 影响行数: {affected_rows}")
+                    if not self._autocommit:
+                        conn.commit()
+                    logger.debug("批量执行成功: %s, 参数数量: %s, 影响行数: %s", sql, len(params_list), affected_rows)
                     return affected_rows
+                except Exception as e:
+                    if not self._autocommit:
+                        conn.rollback()
+                    logger.error("批量执行失败: %s, 参数数量: %s, 错误: %s", sql, len(params_list), e)
+                    raise
+    
+    def execute_in_transaction(self, statements: List[Tuple[str, tuple]]) -> List[int]:
+        """在同一事务中依次执行多条语句，只提交一次，返回各语句的影响行数"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                try:
+                    # autocommit模式下需显式开启事务，否则每条语句各自提交
+                    if self._autocommit:
+                        conn.begin()
+                    affected = [cursor.execute(sql, params) for sql, params in statements]
+                    conn.commit()
+                    logger.debug("事务执行成功: %s条语句, 影响行数: %s", len(statements), affected)
+                    return affected
                 except Exception as e:
                     conn.rollback()
-                    logger.error(f"批量执行失败: {sql}, 参数数量: {len(params_list)}, 错误: {e}")
+                    logger.error("事务执行失败: %s, 错误: %s", statements, e)
                     raise
     
     def table_exists(self, table_name: str) -> bool:
@@ -208,35 +446,43 @@ class MySQLService:
             result = self.execute_query(sql, (table_name,))
             return len(result) > 0
         except Exception as e:
-            logger.error(f"检查表是否存在失败: {table_name}, 错误: {e}")
+            logger.error("检查表是否存在失败: %s, 错误: %s", table_name, e)
             return False
     
+    def _existing_tables(self, names: List[str]) -> set:
+        """一次查询返回names中已存在于当前数据库的表名"""
+        placeholders = ', '.join(['%s'] * len(names))
+        sql = f"""
+        SELECT TABLE_NAME AS table_name FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+        """
+        return {row['table_name'] for row in self.execute_query(sql, tuple(names))}
+    
     def create_tables(self):
         """创建必要的数据库表"""
         try:
-            # 文件信息表
-            if not self.table_exists('files'):
-                self._create_files_table()
-            
-            # 文件操作日志表
-            if not self.table_exists('file_operations'):
-                self._create_file_operations_table()
-            
-            # 用户会话表
-            if not self.table_exists('user_sessions'):
-                self._create_user_sessions_table()
-            
-            # 系统配置表
-            if not self.table_exists('system_configs'):
-                self._create_system_configs_table()
+            tables = {
+                'files': self._create_files_table,                      # 文件信息表
+                'file_operations': self._create_file_operations_table,  # 文件操作日志表
+                'user_sessions': self._create_user_sessions_table,      # 用户会话表
+                'system_configs': self._create_system_configs_table,    # 系统配置表
+                'users': self._create_users_table,                      # 用户表
+            }
             
-            # 用户表
-            if not self.table_exists('users'):
-                self._create_users_table()
+            existing = self._existing_tables(list(tables))
+            missing = [create for name, create in tables.items() if name not in existing]
+            if len(missing) > 1:
+                # 各表之间没有外键依赖，建表语句分别借用连接并发执行，总耗时取决于最慢的一条
+                with ThreadPoolExecutor(max_workers=min(len(missing), self.max_connections),
+                                        thread_name_prefix="MySQLCreateTable") as executor:
+                    for future in [executor.submit(create) for create in missing]:
+                        future.result()
+            elif missing:
+                missing[0]()
             
             logger.info("数据库表创建完成")
         except Exception as e:
-            logger.error(f"创建数据库表失败: {e}")
+            logger.error("创建数据库表失败: %s", e)
             raise
     
     def _create_files_table(self):
@@ -331,19 +577,26 @@ class MySQLService:
                           user_ip: str = None, user_agent: str = None,
                           status: str = 'success', error_message: str = None,
                           duration_ms: int = None):
-        """记录文件操作日志"""
-        sql = """
-        INSERT INTO file_operations 
-        (operation_type, file_path, file_name, file_size, user_ip, user_agent, status, error_message, duration_ms)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """记录文件操作日志（入队后由后台线程批量写入，不阻塞调用方）"""
+        row = (
+            operation_type, file_path, file_name, file_size,
+            user_ip, user_agent, status, error_message, duration_ms
+        )
+        if not self._op_log_writer.submit(row, self.log_file_operations_bulk):
+            # 数据库写入跟不上时丢弃日志，不阻塞文件操作
+            logger.warning("操作日志队列已满，丢弃日志: %s %s", operation_type, file_path)
+    
+    def log_file_operations_bulk(self, rows: List[tuple]) -> int:
+        """批量记录文件操作日志
+        
+        rows: 按 (operation_type, file_path, file_name, file_size, user_ip,
+              user_agent, status, error_message, duration_ms) 排列的元组列表
         """
-        try:
-            self.execute_update(sql, (
-                operation_type, file_path, file_name, file_size,
-                user_ip, user_agent, status, error_message, duration_ms
-            ))
-        except Exception as e:
-            logger.error(f"记录文件操作日志失败: {e}")
+        if not rows:
+            return 0
+        
+        # 失败时抛出异常，由调用方决定重试或丢弃
+        return self.execute_many(_FILE_OPERATION_INSERT_SQL, rows)
     
     def get_file_info(self, file_path: str) -> Optional[Dict[str, Any]]:
         """获取文件信息"""
@@ -352,57 +605,95 @@ class MySQLService:
             result = self.execute_query(sql, (file_path,))
             return result[0] if result else None
         except Exception as e:
-            logger.error(f"获取文件信息失败: {file_path}, 错误: {e}")
+            logger.error("获取文件信息失败: %s, 错误: %s", file_path, e)
             return None
     
     def save_file_info(self, file_info: Dict[str, Any]) -> bool:
-        """保存文件信息"""
-        sql = """
-        INSERT INTO files 
-        (file_path, file_name, file_size, file_type, mime_type, hash_value, 
-         is_directory, parent_path, owner)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        file_size = VALUES(file_size),
-        modified_time = CURRENT_TIMESTAMP
-        """
+        """保存单条文件信息（save_file_infos_bulk的薄封装）"""
         try:
-            # 添加调试日志
-            logger.info(f"尝试保存文件信息: {file_info.get('file_path')}")
-            
-            result = self.execute_update(sql, (
-                file_info.get('file_path'),
-                file_info.get('file_name'),
-                file_info.get('file_size', 0),
-                file_info.get('file_type'),
-                file_info.get('mime_type'),
-                file_info.get('hash_value'),
-                file_info.get('is_directory', False),
-                file_info.get('parent_path'),
-                file_info.get('owner')
-            ))
-            
-            logger.info(f"文件信息保存成功: {file_info.get('file_path')}, 影响行数: {result}")
+            result = self.save_file_infos_bulk([file_info])
+            logger.debug("文件信息保存成功: %s, 影响行数: %s", file_info.get('file_path'), result)
             return True
             
         except Exception as e:
-            logger.error(f"保存文件信息失败: {file_info.get('file_path')}, 错误: {e}")
+            logger.error("保存文件信息失败: %s, 错误: %s", file_info.get('file_path'), e)
             # 重新抛出异常以便调试
             raise
     
+    def save_file_infos_bulk(self, file_infos: List[Dict[str, Any]]) -> int:
+        """批量保存文件信息（一条多行upsert）
+        
+        驱动的executemany会把INSERT ... VALUES改写为多行VALUES，
+        整批在一次往返、一个事务内完成；批量入库的调用方应优先使用本方法
+        """
+        if not file_infos:
+            return 0
+        
+        rows = [(
+            info.get('file_path'),
+            info.get('file_name'),
+            info.get('file_size', 0),
+            info.get('file_type'),
+            info.get('mime_type'),
+            info.get('hash_value'),
+            info.get('is_directory', False),
+            info.get('parent_path'),
+            info.get('owner')
+        ) for info in file_infos]
+        return self.execute_many(_FILE_INFO_UPSERT_SQL, rows)
+    
+    def rename_file_info(self, old_path: str, file_info: Dict[str, Any],
+                         replace_existing: bool = False) -> int:
+        """将文件记录改为新路径，返回该记录的影响行数（0表示旧记录不存在）
+        
+        目录改名时，其下所有记录的file_path/parent_path前缀在同一事务中一并替换。
+        replace_existing为True时，先在同一事务中删除新路径（及其下）已有的陈旧记录，避免唯一键冲突
+        """
+        new_path = file_info.get('file_path')
+        statements = []
+        if replace_existing:
+            statements.append(("DELETE FROM files WHERE file_path = %s", (new_path,)))
+            if file_info.get('is_directory'):
+                statements.append(("DELETE FROM files WHERE file_path LIKE %s",
+                                   (self._like_prefix(new_path),)))
+        rename_index = len(statements)
+        statements.append((_FILE_INFO_RENAME_SQL, (
+            new_path,
+            file_info.get('file_name'),
+            file_info.get('parent_path'),
+            file_info.get('file_type'),
+            file_info.get('mime_type'),
+            old_path
+        )))
+        
+        if file_info.get('is_directory'):
+            # 按字符位置截取旧前缀之后的部分，避免REPLACE误改路径中间的同名片段
+            tail_start = len(old_path) + 1
+            statements.append((_FILE_INFO_RENAME_CHILDREN_SQL, (
+                new_path, tail_start, new_path, tail_start, self._like_prefix(old_path)
+            )))
+        
+        return self.execute_in_transaction(statements)[rename_index]
+    
+    @staticmethod
+    def _like_prefix(directory: str) -> str:
+        """目录下所有路径的LIKE模式，转义通配符"""
+        return (directory.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                + os.sep + '%')
+    
     def delete_file_info(self, file_path: str) -> bool:
         """删除文件信息"""
         sql = "DELETE FROM files WHERE file_path = %s"
         try:
             # 添加调试日志
-            logger.info(f"尝试删除文件信息: {file_path}")
+            logger.info("尝试删除文件信息: %s", file_path)
             
             affected_rows = self.execute_update(sql, (file_path,))
-            logger.info(f"文件信息删除成功: {file_path}, 影响行数: {affected_rows}")
+            logger.info("文件信息删除成功: %s, 影响行数: %s", file_path, affected_rows)
             return affected_rows > 0
             
         except Exception as e:
-            logger.error(f"删除文件信息失败: {file_path}, 错误: {e}")
+            logger.error("删除文件信息失败: %s, 错误: %s", file_path, e)
             # 重新抛出异常以便调试
             raise
     
@@ -428,46 +719,66 @@ class MySQLService:
                 'success_rate': sum(op['success_count'] for op in result) / max(sum(op['count'] for op in result), 1) * 100
             }
         except Exception as e:
-            logger.error(f"获取操作统计失败: {e}")
+            logger.error("获取操作统计失败: %s", e)
             return {}
     
-    def cleanup_old_logs(self, retention_days: int = 30) -> Dict[str, Any]:
-        """清理超过保留天数的操作日志"""
+    def cleanup_old_logs(self, retention_days: int = 30, batch_size: int = 10000,
+                         pause_seconds: float = 1.0, max_batches: int = 100,
+                         count_remaining: bool = False,
+                         stop_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """清理超过保留天数的操作日志
+        
+        按operation_time索引分批删除，每批最多batch_size条并单独提交，批次之间暂停pause_seconds，
+        避免一次大DELETE长时间持有行锁、产生大事务；单次最多执行max_batches批，其余留到下次清理。
+        每批一次提交（一次redo日志刷盘）；batch_size × 平均行大小应明显小于innodb_log_file_size，
+        否则单批事务过大。
+        不预先统计过期记录数（那需要额外扫描一遍索引），由各批DELETE的影响行数累计；
+        count_remaining为True时在清理后统计一次剩余记录数，否则remaining_count为None。
+        传入stop_event时，批次之间的暂停可被其打断，置位后不再执行后续批次。
+        """
         try:
-            # 获取清理前的记录数
-            count_sql = """
-            SELECT COUNT(*) as total_count,
-                   COUNT(CASE WHEN operation_time < DATE_SUB(NOW(), INTERVAL %s DAY) THEN 1 END) as old_count
-            FROM file_operations
-            """
-            count_result = self.execute_query(count_sql, (retention_days,))
-            total_count = count_result[0]['total_count'] if count_result else 0
-            old_count = count_result[0]['old_count'] if count_result else 0
-            
-            if old_count == 0:
-                return {
-                    'success': True,
-                    'message': f'没有超过{retention_days}天的日志需要清理',
-                    'deleted_count': 0,
-                    'remaining_count': total_count,
-                    'retention_days': retention_days
-                }
+            # 本次清理的截止时间，各批次使用同一截止时间
+            cutoff_result = self.execute_query(
+                "SELECT DATE_SUB(NOW(), INTERVAL %s DAY) as cutoff", (retention_days,)
+            )
+            cutoff = cutoff_result[0]['cutoff']
             
-            # 删除超过保留天数的日志
+            # 分批删除超过保留天数的日志
             delete_sql = """
             DELETE FROM file_operations 
-            WHERE operation_time < DATE_SUB(NOW(), INTERVAL %s DAY)
+            WHERE operation_time < %s
+            ORDER BY operation_time
+            LIMIT %s
             """
-            deleted_count = self.execute_update(delete_sql, (retention_days,))
+            deleted_count = 0
+            for batch in range(1, max_batches + 1):
+                affected = self.execute_update(delete_sql, (cutoff, batch_size))
+                deleted_count += affected
+                if affected < batch_size:
+                    break
+                if batch == max_batches:
+                    logger.info("已达到单次清理批次上限(%s批)，剩余过期日志留到下次清理", max_batches)
+                    break
+                if stop_event is None:
+                    time.sleep(pause_seconds)
+                elif stop_event.wait(pause_seconds):
+                    logger.info("收到停止信号，剩余过期日志留到下次清理")
+                    break
             
-            # 获取清理后的记录数
-            remaining_count = total_count - deleted_count
+            remaining_count = None
+            if count_remaining:
+                count_result = self.execute_query("SELECT COUNT(*) as total_count FROM file_operations")
+                remaining_count = count_result[0]['total_count'] if count_result else 0
             
-            logger.info(f"操作日志清理完成: 删除了{deleted_count}条超过{retention_days}天的记录，剩余{remaining_count}条")
+            logger.info("操作日志清理完成: 删除了%s条超过%s天的记录", deleted_count, retention_days)
             
+            if deleted_count:
+                message = f'成功清理{deleted_count}条超过{retention_days}天的操作日志'
+            else:
+                message = f'没有超过{retention_days}天的日志需要清理'
             return {
                 'success': True,
-                'message': f'成功清理{deleted_count}条超过{retention_days}天的操作日志',
+                'message': message,
                 'deleted_count': deleted_count,
                 'remaining_count': remaining_count,
                 'retention_days': retention_days,
@@ -475,22 +786,107 @@ class MySQLService:
             }
             
         except Exception as e:
-            logger.error(f"清理操作日志失败: {e}")
+            logger.error("清理操作日志失败: %s", e)
             return {
                 'success': False,
                 'message': f'清理操作日志失败: {str(e)}',
                 'error': str(e)
             }
     
+    @staticmethod
+    def _log_partition_bound(name: str) -> Optional[date]:
+        """由分区名pYYYYMMDD解析其上界日期（不含），pmax等其他分区返回None"""
+        try:
+            return datetime.strptime(name[1:], '%Y%m%d').date()
+        except (ValueError, TypeError):
+            return None
+    
+    @staticmethod
+    def _log_partition_def(bound: date) -> str:
+        """按上界日期生成周分区定义"""
+        return f"PARTITION p{bound:%Y%m%d} VALUES LESS THAN (TO_DAYS('{bound:%Y-%m-%d}'))"
+    
+    def get_log_partitions(self) -> List[Dict[str, Any]]:
+        """返回file_operations表的分区（按位置排序），未分区时返回空列表"""
+        sql = """
+        SELECT PARTITION_NAME AS name, TABLE_ROWS AS table_rows
+        FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'file_operations'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """
+        return self.execute_query(sql)
+    
+    def ensure_log_partitions(self, weeks_ahead: int = 4) -> int:
+        """确保file_operations按周RANGE分区，并预建未来weeks_ahead周的分区，返回新建的分区数
+        
+        表尚未分区时将其转换为分区表：分区键须包含在主键中，主键改为(id, operation_time)。
+        转换需要重建表，已有历史数据都落在第一个分区中，超过保留期后整体删除。
+        """
+        today = date.today()
+        this_week = today - timedelta(days=today.weekday())
+        wanted = [this_week + timedelta(weeks=i) for i in range(1, weeks_ahead + 1)]
+        
+        partitions = self.get_log_partitions()
+        if not partitions:
+            definitions = ',\n'.join(
+                [self._log_partition_def(this_week)]
+                + [self._log_partition_def(bound) for bound in wanted]
+                + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+            )
+            self.execute_update(f"""
+            ALTER TABLE file_operations
+            DROP PRIMARY KEY, ADD PRIMARY KEY (id, operation_time)
+            PARTITION BY RANGE (TO_DAYS(operation_time)) (
+            {definitions}
+            )
+            """)
+            logger.info("file_operations已转换为按周分区表，共%s个分区", len(wanted) + 2)
+            return len(wanted) + 2
+        
+        existing = [self._log_partition_bound(p['name']) for p in partitions]
+        latest = max((bound for bound in existing if bound), default=this_week)
+        missing = [bound for bound in wanted if bound > latest]
+        if not missing:
+            return 0
+        
+        # pmax中通常没有数据，拆分它几乎不需要移动数据
+        definitions = ',\n'.join(
+            [self._log_partition_def(bound) for bound in missing]
+            + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+        )
+        self.execute_update(f"""
+        ALTER TABLE file_operations REORGANIZE PARTITION pmax INTO (
+        {definitions}
+        )
+        """)
+        logger.info("为file_operations新建了%s个周分区", len(missing))
+        return len(missing)
+    
+    def drop_expired_log_partitions(self, retention_days: int) -> Dict[str, Any]:
+        """整分区删除所有数据都已超过保留天数的分区，无需逐行删除
+        
+        保留期边界所在分区中的过期数据仍由cleanup_old_logs按批删除
+        """
+        cutoff = date.today() - timedelta(days=retention_days)
+        expired = [
+            p for p in self.get_log_partitions()
+            if (bound := self._log_partition_bound(p['name'])) is not None and bound <= cutoff
+        ]
+        if not expired:
+            return {'dropped_partitions': [], 'dropped_rows': 0}
+        
+        names = [p['name'] for p in expired]
+        self.execute_update(f"ALTER TABLE file_operations DROP PARTITION {', '.join(names)}")
+        # TABLE_ROWS为InnoDB的估计值
+        dropped_rows = sum(p['table_rows'] or 0 for p in expired)
+        logger.info("删除过期日志分区: %s，约%s条记录", names, dropped_rows)
+        return {'dropped_partitions': names, 'dropped_rows': dropped_rows}
+    
     def get_log_retention_info(self) -> Dict[str, Any]:
         """获取日志保留信息"""
         try:
-            # 获取总记录数
-            total_sql = "SELECT COUNT(*) as total FROM file_operations"
-            total_result = self.execute_query(total_sql)
-            total_count = total_result[0]['total'] if total_result else 0
-            
-            # 获取各时间段的记录数
+            # 各时间段的记录数
             time_ranges = [
                 (1, "1天内"),
                 (7, "7天内"),
@@ -499,26 +895,27 @@ class MySQLService:
                 (365, "1年内")
             ]
             
-            retention_stats = {}
-            for days, label in time_ranges:
-                sql = """
-                SELECT COUNT(*) as count
-                FROM file_operations 
-                WHERE operation_time >= DATE_SUB(NOW(), INTERVAL %s DAY)
-                """
-                result = self.execute_query(sql, (days,))
-                count = result[0]['count'] if result else 0
-                retention_stats[label] = count
+            # 总数、各时间段计数和最早/最新时间用一条条件聚合查询取得，只扫描一次
+            range_columns = ',\n'.join(
+                f"SUM(operation_time >= DATE_SUB(NOW(), INTERVAL {days} DAY)) as d{days}"
+                for days, _ in time_ranges
+            )
+            sql = f"""
+            SELECT COUNT(*) as total,
+            {range_columns},
+            MIN(operation_time) as oldest_time,
+            MAX(operation_time) as newest_time
+            FROM file_operations
+            """
+            result = self.execute_query(sql)
+            row = result[0] if result else {}
+            total_count = row.get('total') or 0
             
-            # 获取最早的日志时间
-            oldest_sql = "SELECT MIN(operation_time) as oldest_time FROM file_operations"
-            oldest_result = self.execute_query(oldest_sql)
-            oldest_time = oldest_result[0]['oldest_time'] if oldest_result and oldest_result[0]['oldest_time'] else None
+            # 空表时SUM返回NULL；非空时为DECIMAL，统一转换为int
+            retention_stats = {label: int(row.get(f'd{days}') or 0) for days, label in time_ranges}
             
-            # 获取最新的日志时间
-            newest_sql = "SELECT MAX(operation_time) as newest_time FROM file_operations"
-            newest_result = self.execute_query(newest_sql)
-            newest_time = newest_result[0]['newest_time'] if newest_result and newest_result[0]['newest_time'] else None
+            oldest_time = row.get('oldest_time')
+            newest_time = row.get('newest_time')
             
             return {
                 'success': True,
@@ -531,18 +928,26 @@ class MySQLService:
             }
             
         except Exception as e:
-            logger.error(f"获取日志保留信息失败: {e}")
+            logger.error("获取日志保留信息失败: %s", e)
             return {
                 'success': False,
                 'message': f'获取日志保留信息失败: {str(e)}',
                 'error': str(e)
             }
     
-    def optimize_log_table(self) -> Dict[str, Any]:
-        """优化日志表性能"""
+    def optimize_log_table(self, fragmentation_threshold: float = 0.0) -> Dict[str, Any]:
+        """优化日志表性能
+        
+        InnoDB上OPTIMIZE TABLE会重建整张表，仅当碎片空间占数据和索引总量的比例
+        超过fragmentation_threshold时才执行
+        """
         try:
             # 获取表状态信息
-            status_sql = "SHOW TABLE STATUS LIKE 'file_operations'"
+            status_sql = """
+            SELECT DATA_FREE AS data_free, DATA_LENGTH AS data_length, INDEX_LENGTH AS index_length
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'file_operations'
+            """
             status_result = self.execute_query(status_sql)
             
             if not status_result:
@@ -552,12 +957,14 @@ class MySQLService:
                 }
             
             table_info = status_result[0]
-            data_length = table_info.get('Data_length', 0)
-            index_length = table_info.get('Index_length', 0)
-            data_free = table_info.get('Data_free', 0)
+            data_length = table_info.get('data_length') or 0
+            index_length = table_info.get('index_length') or 0
+            data_free = table_info.get('data_free') or 0
+            used = data_length + index_length
+            fragmentation = data_free / used if used else 0.0
             
-            # 如果存在碎片，进行优化
-            if data_free > 0:
+            # 碎片比例超过阈值时才进行优化
+            if data_free > 0 and fragmentation > fragmentation_threshold:
                 optimize_sql = "OPTIMIZE TABLE file_operations"
                 self.execute_update(optimize_sql)
                 
@@ -572,16 +979,17 @@ class MySQLService:
                     'optimization_time': datetime.now().isoformat()
                 }
             else:
+                logger.info("日志表碎片比例%.1f%%未超过阈值，跳过优化", fragmentation * 100)
                 return {
                     'success': True,
-                    'message': '日志表无需优化，没有碎片',
+                    'message': '日志表无需优化，碎片比例未超过阈值',
                     'data_length_mb': round(data_length / 1024 / 1024, 2),
                     'index_length_mb': round(index_length / 1024 / 1024, 2),
                     'fragmented_space_mb': 0
                 }
                 
         except Exception as e:
-            logger.error(f"优化日志表失败: {e}")
+            logger.error("优化日志表失败: %s", e)
             return {
                 'success': False,
                 'message': f'优化日志表失败: {str(e)}',
@@ -589,23 +997,27 @@ class MySQLService:
             }
     
     def is_connected(self) -> bool:
-        """检查数据库连接状态"""
+        """检查数据库连接状态；探测成功后的_CONNECTED_TTL秒内直接返回True，不再发探测查询"""
+        if time.monotonic() - self._connected_at < _CONNECTED_TTL:
+            return True
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
                     cursor.execute("SELECT 1")
-                    return True
+            self._connected_at = time.monotonic()
+            return True
         except Exception:
+            self._connected_at = float('-inf')
             return False
     
     def close_all_connections(self):
         """关闭所有数据库连接"""
-        for conn in self.connection_pool:
-            try:
-                conn.close()
-            except:
-                pass
-        self.connection_pool.clear()
+        self._reaper_stop.set()
+        with self._pool_lock:
+            connections = list(self.connection_pool)
+            self.connection_pool.clear()
+        for conn in connections:
+            self._close_quietly(conn)
         logger.info("所有MySQL连接已关闭")
     
     def _create_users_table(self):
@@ -635,7 +1047,7 @@ class MySQLService:
             result = self.execute_query(sql, (email,))
             return result[0]['count'] > 0 if result else False
         except Exception as e:
-            logger.error(f"检查用户是否存在失败: {email}, 错误: {e}")
+            logger.error("检查用户是否存在失败: %s, 错误: %s", email, e)
             return False
     
     def create_user(self, user_data: Dict[str, Any]) -> Optional[int]:
@@ -652,10 +1064,10 @@ class MySQLService:
                 user_data.get('status', 'active'),
                 user_data['created_at']
             ))
-            logger.info(f"用户创建成功: {user_data['email']}, 用户ID: {user_id}")
+            logger.info("用户创建成功: %s, 用户ID: %s", user_data['email'], user_id)
             return user_id
         except Exception as e:
-            logger.error(f"创建用户失败: {user_data['email']}, 错误: {e}")
+            logger.error("创建用户失败: %s, 错误: %s", user_data['email'], e)
             return None
     
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
@@ -665,7 +1077,7 @@ class MySQLService:
             result = self.execute_query(sql, (email,))
             return result[0] if result else None
         except Exception as e:
-            logger.error(f"根据邮箱获取用户信息失败: {email}, 错误: {e}")
+            logger.error("根据邮箱获取用户信息失败: %s, 错误: %s", email, e)
             return None
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -675,7 +1087,7 @@ class MySQLService:
             result = self.execute_query(sql, (user_id,))
             return result[0] if result else None
         except Exception as e:
-            logger.error(f"根据ID获取用户信息失败: {user_id}, 错误: {e}")
+            logger.error("根据ID获取用户信息失败: %s, 错误: %s", user_id, e)
             return None
     
     def update_user_last_login(self, user_id: int) -> bool:
@@ -685,7 +1097,7 @@ class MySQLService:
             affected_rows = self.execute_update(sql, (user_id,))
             return affected_rows > 0
         except Exception as e:
-            logger.error(f"更新用户最后登录时间失败: {user_id}, 错误: {e}")
+            logger.error("更新用户最后登录时间失败: %s, 错误: %s", user_id, e)
             return False
     
     def update_user_password(self, user_id: int, password_hash: str) -> bool:
@@ -695,22 +1107,39 @@ class MySQLService:
             affected_rows = self.execute_update(sql, (password_hash, user_id))
             return affected_rows > 0
         except Exception as e:
-            logger.error(f"更新用户密码失败: {user_id}, 错误: {e}")
+            logger.error("更新用户密码失败: %s, 错误: %s", user_id, e)
             return False
     
-    def get_current_time(self):
-        """获取当前数据库时间"""
+    def _sync_db_clock(self):
+        """查询一次数据库时间，记录其相对本机时钟的偏移；失败时保留原偏移"""
+        self._clock_synced_at = time.monotonic()
+        self._clock_utcoffset = datetime.now().astimezone().utcoffset()
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("SELECT NOW() as current_time")
-                    result = cursor.fetchone()
-                    return result['current_time']
+                    before = datetime.now()
+                    # current_time是保留字（CURRENT_TIME函数），不能作列别名
+                    cursor.execute("SELECT NOW(6) AS db_now")
+                    db_now = cursor.fetchone()['db_now']
+                    after = datetime.now()
+            # 以往返的中点作为数据库取时刻，抵消网络延迟
+            self._db_clock_offset = db_now - (before + (after - before) / 2)
+            logger.debug("数据库时钟偏移: %s", self._db_clock_offset)
         except Exception as e:
-            logger.error(f"获取数据库当前时间失败: {e}")
-            # 如果数据库时间获取失败，返回Python当前时间
-            from datetime import datetime
-            return datetime.now()
+            logger.error("校准数据库时钟失败: %s", e)
+    
+    def get_current_time(self) -> datetime:
+        """获取当前数据库时间：本机时间加上数据库时钟偏移
+        
+        首次调用时校准，此后每_CLOCK_SYNC_INTERVAL秒重新校准一次；
+        本机UTC偏移变化（夏令时切换）时立即重新校准
+        """
+        now = datetime.now()
+        if (time.monotonic() - self._clock_synced_at >= _CLOCK_SYNC_INTERVAL
+                or now.astimezone().utcoffset() != self._clock_utcoffset):
+            self._sync_db_clock()
+            now = datetime.now()
+        return now + self._db_clock_offset
 
 # 全局MySQL服务实例
 _mysql_service = None
@@ -726,5 +1155,7 @@ def close_mysql_service():
     """关闭MySQL服务"""
     global _mysql_service
     if _mysql_service:
+        # 先写入尚在队列中的操作日志
+        _mysql_service._op_log_writer.drain()
         _mysql_service.close_all_connections()
         _mysql_service = None
@@ -11,6 +11,12 @@ import threading
 from typing import Any, Optional, Union, List, Dict
 from utils.logger import get_logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = get_logger('redis_service')
 
 class RedisService:
@@ -20,14 +26,15 @@ class RedisService:
         """初始化Redis服务"""
         if config is None:
             # 延迟导入避免循环依赖
-            from core.config import Config
-            config = Config()
+            from core.config import config as global_config
+            config = global_config
         
         self.config = config
         self._redis_client = None
         self._connection_pool = None
         self._use_memory_fallback = False
         self._memory_storage = {}  # 内存存储作为Redis的备用方案
+        self._unlink_supported = None  # 服务端是否支持UNLINK，首次使用时检测
         self._init_connection()
     
     def _init_connection(self):
@@ -158,7 +165,7 @@ class RedisService:
             
             # 尝试解析JSON（用于其他复杂数据）
             try:
-                return json.loads(value)
+                return _json_loads(value)
             except:
                 return value
         except Exception as e:
@@ -180,6 +187,35 @@ class RedisService:
             logger.error(f"Redis DELETE操作失败: {e}")
             return 0
     
+    def _delete_keys(self, client, keys) -> int:
+        """删除一批键：支持时用UNLINK（在后台线程释放内存，不阻塞Redis），否则用DEL"""
+        if self._unlink_supported is None:
+            try:
+                version = client.info('server').get('redis_version', '0')
+                self._unlink_supported = int(version.split('.')[0]) >= 4
+            except Exception as e:
+                logger.warning(f"检测Redis版本失败，使用DEL删除键: {e}")
+                self._unlink_supported = False
+        
+        if self._unlink_supported:
+            return client.unlink(*keys)
+        return client.delete(*keys)
+    
+    def unlink(self, *keys: str) -> int:
+        """删除键，内存在Redis后台释放，适合删除可能较大的缓存值"""
+        if self._use_memory_fallback:
+            return self._memory_delete(*keys)
+        
+        try:
+            client = self.get_client()
+            if client is None:
+                return 0
+            
+            return self._delete_keys(client, keys)
+        except Exception as e:
+            logger.error(f"Redis UNLINK操作失败: {e}")
+            return 0
+    
     def exists(self, *keys: str) -> int:
         """检查键是否存在"""
         if self._use_memory_fallback:
@@ -552,6 +588,30 @@ class RedisService:
             logger.error(f"Redis KEYS操作失败: {e}")
             return []
     
+    def delete_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """删除匹配模式的键，返回删除数量
+        
+        用SCAN增量遍历代替KEYS，每批用UNLINK（Redis 4.0以下为DEL）删除，不会长时间阻塞Redis
+        """
+        try:
+            client = self.get_client()
+            if client is None:
+                return 0
+            
+            deleted = 0
+            batch = []
+            for key in client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += self._delete_keys(client, batch)
+                    batch = []
+            if batch:
+                deleted += self._delete_keys(client, batch)
+            return deleted
+        except Exception as e:
+            logger.error(f"Redis按模式删除失败: {e}")
+            return 0
+    
     def flushdb(self) -> bool:
         """清空当前数据库"""
         try:
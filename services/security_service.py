@@ -9,17 +9,34 @@ import mimetypes
 import hashlib
 from pathlib import Path, PurePath
 from typing import Tuple, List, Dict, Any, Optional
-from core.config import Config
+from core.config import config
 from utils.logger import get_logger
 from services.mysql_service import get_mysql_service
 
 logger = get_logger(__name__)
 
+# 危险MIME类型
+_DANGEROUS_MIME_TYPES = frozenset({
+    'application/x-executable',
+    'application/x-msdownload',
+    'application/x-msi',
+    'application/x-ms-shortcut',
+    'application/x-msdos-program',
+    'application/x-msu',
+    'application/x-powershell',
+    'text/javascript',
+    'application/javascript',
+    'application/x-javascript',
+})
+
+# 常见的系统/配置文件名
+_SYSTEM_FILE_RE = re.compile(r'^(?:desktop\.ini|thumbs\.db|\.ds_store|\.gitignore|\.env)$')
+
 class SecurityService:
     """安全服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.mysql_service = get_mysql_service()
         self._init_forbidden_patterns()
     
@@ -27,6 +44,8 @@ class SecurityService:
         """初始化禁止的模式"""
         # 危险字符模式
         self.dangerous_chars = ['<', '>', ':', '"', '|', '?', '*', '\\', '/']
+        self._dangerous_chars_re = re.compile('[' + re.escape(''.join(self.dangerous_chars)) + ']')
+        self._dangerous_chars_table = str.maketrans(dict.fromkeys(self.dangerous_chars, '_'))
         
         # Windows保留名称
         self.reserved_names = {
@@ -134,7 +153,8 @@ class SecurityService:
         """
         try:
             # 1. 基本检查
-            if not filename or not filename.strip():
+            stripped = filename.strip() if filename else ''
+            if not stripped:
                 return False, "文件名不能为空"
             
             # 2. 长度检查
@@ -142,9 +162,9 @@ class SecurityService:
                 return False, "文件名过长（最大255字符）"
             
             # 3. 危险字符检查
-            for char in self.dangerous_chars:
-                if char in filename:
-                    return False, f"文件名包含危险字符: {char}"
+            match = self._dangerous_chars_re.search(filename)
+            if match:
+                return False, f"文件名包含危险字符: {match.group()}"
             
             # 4. 保留名称检查
             name_without_ext = os.path.splitext(filename)[0].upper()
@@ -159,7 +179,7 @@ class SecurityService:
             if not self._validate_extension(filename):
                 return False, "文件扩展名不被允许"
             
-            return True, filename.strip()
+            return True, stripped
             
         except Exception as e:
             logger.error(f"文件名验证失败: {filename}, 错误: {e}")
@@ -176,17 +196,8 @@ class SecurityService:
             return False  # 允许临时文件
         
         # 检查其他特殊模式
-        suspicious_patterns = [
-            r'^desktop\.ini$',
-            r'^thumbs\.db$',
-            r'^\.ds_store$',
-            r'^\.gitignore$',
-            r'^\.env$',
-        ]
-        
-        for pattern in suspicious_patterns:
-            if re.match(pattern, filename.lower()):
-                return False  # 这些是正常的系统文件
+        if _SYSTEM_FILE_RE.match(filename.lower()):
+            return False  # 这些是正常的系统文件
         
         return False
     
@@ -231,22 +242,7 @@ class SecurityService:
     
     def _validate_mime_type(self, mime_type: str) -> bool:
         """验证MIME类型"""
-        # 危险MIME类型
-        dangerous_mimes = {
-            'application/x-executable',
-            'application/x-msdownload',
-            'application/x-msi',
-            'application/x-ms-shortcut',
-            'application/x-msdos-program',
-            'application/x-msi',
-            'application/x-msu',
-            'application/x-powershell',
-            'text/javascript',
-            'application/javascript',
-            'application/x-javascript',
-        }
-        
-        if mime_type in dangerous_mimes:
+        if mime_type in _DANGEROUS_MIME_TYPES:
             return False
         
         # 检查可执行文件
@@ -290,9 +286,7 @@ class SecurityService:
         """
         try:
             # 替换危险字符
-            sanitized = filename
-            for char in self.dangerous_chars:
-                sanitized = sanitized.replace(char, '_')
+            sanitized = filename.translate(self._dangerous_chars_table)
             
             # 移除多余的下划线
             sanitized = re.sub(r'_+', '_', sanitized)
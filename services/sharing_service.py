@@ -157,41 +157,16 @@ class SharingService:
                 if not os.path.exists(shared_dir):
                     return []
                 
-                shared_files = []
-                for filename in os.listdir(shared_dir):
-                    file_path = os.path.join(shared_dir, filename)
-                    if os.path.isfile(file_path):
-                        shared_files.append({
-                            'name': filename,
-                            'path': f'{username}_shared/{filename}',
-                            'size': os.path.getsize(file_path),
-                            'owner': username,
-                            'shared_path': file_path,
-                            'is_directory': False,
-                            'modified_time': os.path.getmtime(file_path)
-                        })
-                return shared_files
+                return self._scan_shared_dir(shared_dir, username)
             else:
                 # 获取所有共享文件
                 all_shared_files = []
-                for item in os.listdir(self.shared_base_dir):
-                    if item.endswith('_shared') and os.path.isdir(os.path.join(self.shared_base_dir, item)):
-                        owner = item.replace('_shared', '')  # 移除 '_shared' 后缀
-                        # 直接获取该用户的共享文件，避免递归调用
-                        shared_dir = os.path.join(self.shared_base_dir, item)
-                        if os.path.exists(shared_dir):
-                            for filename in os.listdir(shared_dir):
-                                file_path = os.path.join(shared_dir, filename)
-                                if os.path.isfile(file_path):
-                                    all_shared_files.append({
-                                        'name': filename,
-                                        'path': f'{owner}_shared/{filename}',
-                                        'size': os.path.getsize(file_path),
-                                        'owner': owner,
-                                        'shared_path': file_path,
-                                        'is_directory': False,
-                                        'modified_time': os.path.getmtime(file_path)
-                                    })
+                with os.scandir(self.shared_base_dir) as it:
+                    for entry in it:
+                        if entry.name.endswith('_shared') and entry.is_dir():
+                            owner = entry.name.replace('_shared', '')  # 移除 '_shared' 后缀
+                            # 直接获取该用户的共享文件，避免递归调用
+                            all_shared_files.extend(self._scan_shared_dir(entry.path, owner))
                 return all_shared_files
                 
         except Exception as e:
@@ -212,6 +187,25 @@ class SharingService:
             logger.error(f"检查文件共享状态失败: {e}")
             return False
     
+    def _scan_shared_dir(self, shared_dir: str, owner: str) -> List[Dict[str, str]]:
+        """列出一个用户共享目录中的文件，每个文件只stat一次"""
+        shared_files = []
+        with os.scandir(shared_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                shared_files.append({
+                    'name': entry.name,
+                    'path': f'{owner}_shared/{entry.name}',
+                    'size': st.st_size,
+                    'owner': owner,
+                    'shared_path': entry.path,
+                    'is_directory': False,
+                    'modified_time': st.st_mtime
+                })
+        return shared_files
+    
     def _record_shared_file(self, username: str, original_path: str, shared_path: str) -> None:
         """记录共享文件到数据库"""
         try:
@@ -6,7 +6,7 @@
 import os
 import sys
 
-from core.config import Config
+from core.config import config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -15,7 +15,7 @@ class SystemService:
     """系统信息服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
     
     def get_system_info(self):
         """获取系统信息"""
@@ -9,9 +9,10 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from werkzeug.utils import secure_filename
 
-from core.config import Config
+from core.config import config
 from services.mysql_service import get_mysql_service
 from services.cache_service import get_cache_service
+from services.file_service import invalidate_listing_cache
 from utils.logger import get_logger
 from utils.file_utils import FileUtils
 
@@ -21,7 +22,7 @@ class UploadService:
     """文件上传服务类"""
     
     def __init__(self):
-        self.config = Config()
+        self.config = config
         self.mysql_service = None
         self.cache_service = get_cache_service()
         
@@ -33,7 +34,7 @@ class UploadService:
             else:
                 logger.warning("MySQL服务不可用，将跳过数据库日志记录")
         except Exception as e:
-            logger.warning(f"MySQL服务初始化失败: {e}")
+            logger.warning("MySQL服务初始化失败: %s", e)
     
     def _log_operation(self, operation_type: str, file_path: str = None, 
                        file_name: str = None, file_size: int = None, 
@@ -57,7 +58,7 @@ class UploadService:
                 duration_ms=duration_ms
             )
         except Exception as e:
-            logger.error(f"记录操作日志失败: {e}")
+            logger.error("记录操作日志失败: %s", e)
     
     def _save_file_info_to_db(self, file_path: str, file_info: Dict[str, Any]):
         """保存文件信息到数据库"""
@@ -67,37 +68,34 @@ class UploadService:
         try:
             self.mysql_service.save_file_info(file_info)
         except Exception as e:
-            logger.error(f"保存文件信息到数据库失败: {e}")
+            logger.error("保存文件信息到数据库失败: %s", e)
+    
+    def _save_file_infos_to_db(self, file_infos: List[Dict[str, Any]]):
+        """批量保存文件信息到数据库（一条多行upsert）"""
+        if not file_infos or not self.mysql_service or not self.mysql_service.is_connected():
+            return
+        
+        try:
+            self.mysql_service.save_file_infos_bulk(file_infos)
+        except Exception as e:
+            logger.error("批量保存文件信息到数据库失败: %s", e)
     
     def _invalidate_cache(self, file_path: str, current_user: Dict[str, Any] = None) -> None:
-        """清理相关缓存"""
+        """清理相关缓存：文件自身及其父目录在所有用户下的缓存"""
         try:
-            import hashlib
-            
-            # 获取用户ID
-            user_id = current_user['user_id'] if current_user else 'anonymous'
-            logger.info(f"开始清理上传缓存，文件路径: {file_path}, 用户ID: {user_id}")
-            
-            # 清理文件信息缓存
-            file_cache_key = f"file_info:{user_id}:{hashlib.md5(file_path.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(file_cache_key)
-            logger.info(f"清理文件信息缓存: {file_path} -> {file_cache_key}")
-            
-            # 清理父目录的目录列表缓存
             parent_dir = os.path.dirname(file_path) if file_path != '.' else '.'
-            dir_cache_key = f"dir_listing:{user_id}:{hashlib.md5(parent_dir.encode()).hexdigest()[:16]}"
-            self.cache_service.delete(dir_cache_key)
-            logger.info(f"清理父目录缓存: {parent_dir} -> {dir_cache_key}")
+            if parent_dir == "":
+                parent_dir = "."
             
-            # 清理所有相关的目录列表缓存（使用模式匹配）
-            pattern = "dir_listing:*"
-            cleared_count = self.cache_service.clear_pattern(pattern)
-            logger.info(f"清理目录列表缓存模式: {pattern}, 清理了 {cleared_count} 个键")
+            # 进程内目录列表缓存（覆盖写入同名文件时目录mtime不变）
+            invalidate_listing_cache(file_path)
             
-            logger.info(f"上传缓存清理完成，文件路径: {file_path}")
+            cleared_count = self.cache_service.invalidate_path(file_path)
+            cleared_count += self.cache_service.invalidate_path(parent_dir, subtree=False)
+            logger.info("清理缓存: %s, 清理了 %s 个键", file_path, cleared_count)
             
         except Exception as e:
-            logger.error(f"清理缓存失败: {file_path}, 错误: {e}")
+            logger.error("清理缓存失败: %s, 错误: %s", file_path, e)
     
     def upload_file(self, file, target_directory: str, user_ip: str = None, user_agent: str = None, current_user: Dict[str, Any] = None) -> Dict[str, Any]:
         """上传单个文件"""
@@ -205,6 +203,7 @@ class UploadService:
             
             uploaded_files = []
             failed_files = []
+            pending_infos = []
             
             for file in files:
                 try:
@@ -234,8 +233,8 @@ class UploadService:
                     # 获取文件信息
                     file_info = FileUtils.get_file_info(target_path)
                     
-                    # 保存文件信息到数据库
-                    self._save_file_info_to_db(target_path, file_info)
+                    # 文件信息先收集，循环结束后一次写入数据库
+                    pending_infos.append(file_info)
                     
                     uploaded_files.append({
                         'filename': filename,
@@ -249,6 +248,9 @@ class UploadService:
                         'error': str(e)
                     })
             
+            # 保存文件信息到数据库
+            self._save_file_infos_to_db(pending_infos)
+            
             # 清理相关缓存（清理目标目录的缓存）
             self._invalidate_cache(target_directory, current_user)
             
@@ -321,7 +323,7 @@ class UploadService:
             stats = self.mysql_service.get_operation_stats(days)
             return stats
         except Exception as e:
-            logger.error(f"获取上传统计失败: {e}")
+            logger.error("获取上传统计失败: %s", e)
             return {
                 'success': False,
                 'message': str(e)
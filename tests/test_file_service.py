@@ -0,0 +1,48 @@
+"""
+文件服务回归测试
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from services.file_service import FileService
+
+
+def _rmtree_host():
+    """只提供_parallel_rmtree所需配置的最小宿主对象"""
+    return SimpleNamespace(config=SimpleNamespace(FILE_IO_WORKERS=4))
+
+
+def test_parallel_rmtree_refuses_symlink(tmp_path):
+    """经由符号链接调用时不得删除链接目标中的文件"""
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_text('x')
+    root = tmp_path / 'root'
+    root.mkdir()
+    link = root / 'link'
+    os.symlink(outside, link)
+    
+    with pytest.raises(OSError):
+        FileService._parallel_rmtree(_rmtree_host(), str(link))
+    
+    assert (outside / 'keep.txt').exists()
+    assert os.path.islink(link)
+
+
+def test_parallel_rmtree_removes_tree_without_following_links(tmp_path):
+    """目录树内的符号链接只删除链接本身"""
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_text('x')
+    tree = tmp_path / 'tree'
+    (tree / 'sub').mkdir(parents=True)
+    (tree / 'sub' / 'a.txt').write_text('a')
+    os.symlink(outside, tree / 'sub' / 'link')
+    
+    FileService._parallel_rmtree(_rmtree_host(), str(tree))
+    
+    assert not tree.exists()
+    assert (outside / 'keep.txt').exists()
@@ -0,0 +1,121 @@
+"""
+后台批量写入器
+请求线程只入队，由后台守护线程攒批后一次写入数据库
+"""
+
+import time
+import queue
+import atexit
+import threading
+from typing import Any, List
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 批量写入失败时的重试次数和首次退避时间（秒）
+_WRITE_RETRIES = 3
+_WRITE_RETRY_BASE_DELAY = 0.5
+
+# 写入线程空闲时检查停止信号的间隔（秒）
+_STOP_POLL_INTERVAL = 0.5
+
+
+class BatchWriter:
+    """后台批量写入器：请求线程只入队，由单个守护线程攒批后一次写入数据库"""
+    
+    def __init__(self, name: str, maxsize: int = 10000, batch_size: int = 256, linger: float = 0.2):
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._linger = linger
+        self._flush = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+    
+    def submit(self, item: Any, flush) -> bool:
+        """入队一条记录，队列已满时返回False（调用方决定是否丢弃）
+        
+        flush: 接收记录列表并执行批量写入的函数，首次提交时绑定
+        """
+        self._ensure_started(flush)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+    
+    def _ensure_started(self, flush) -> None:
+        """启动写入线程（每个写入器仅一个）"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._flush = flush
+                self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+                self._thread.start()
+                atexit.register(self.drain)
+    
+    def _take(self, block: bool) -> List[Any]:
+        """取出一批记录
+        
+        block为True时最多等待_STOP_POLL_INTERVAL秒取第一条，之后在linger时间窗内继续攒批，
+        直到凑满batch_size；低流量时也能合并成一次INSERT。
+        """
+        items = []
+        get = self._queue.get
+        try:
+            if block:
+                items.append(get(timeout=_STOP_POLL_INTERVAL))
+                deadline = time.monotonic() + self._linger
+                while len(items) < self._batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    items.append(get(timeout=remaining))
+            while len(items) < self._batch_size:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+    
+    def _write(self, items: List[Any]) -> None:
+        """写入一批记录，失败时按指数退避重试，重试耗尽后丢弃"""
+        delay = _WRITE_RETRY_BASE_DELAY
+        for attempt in range(1, _WRITE_RETRIES + 1):
+            try:
+                self._flush(items)
+                return
+            except Exception as e:
+                if attempt == _WRITE_RETRIES:
+                    logger.error("%s 批量写入失败: %s, 丢弃%s条", self.name, e, len(items))
+                    return
+                logger.warning("%s 批量写入失败，%.1f秒后重试: %s", self.name, delay, e)
+                time.sleep(delay)
+                delay *= 2
+    
+    def _run(self) -> None:
+        # 收到停止信号后，写完手上这一批（含重试）再退出，已取出的记录不会丢失
+        while not self._stop.is_set():
+            items = self._take(block=True)
+            if items:
+                self._write(items)
+    
+    def drain(self, timeout: float = 5.0) -> None:
+        """停止写入线程并写入队列中剩余的记录（进程退出时自动调用）
+        
+        先通知写入线程并等待其写完已取出的一批（最多timeout秒），再由当前线程写入剩余记录
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning("%s 写入线程在%s秒内未退出", self.name, timeout)
+        while True:
+            items = self._take(block=False)
+            if not items:
+                return
+            self._write(items)
@@ -4,12 +4,106 @@
 """
 
 import os
+import re
+import shutil
+import mmap
+import stat
 import hashlib
+import functools
 import mimetypes
 import zipfile
 import tarfile
 from datetime import datetime
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# 路径中的危险片段: .. 、连续分隔符以及通配/重定向字符，一次扫描完成匹配
+_DANGEROUS_PATH_RE = re.compile(r'\.\.|\\\\|//|[*?"<>|]')
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
+# 小于该大小的文件直接读取，mmap的建立开销不划算
+_MMAP_MIN_SIZE = 4096
+
+# 扩展名 -> 图标类名，按类别展开为一次字典查找
+_ICON_BY_EXT = {
+    ext: icon
+    for icon, exts in (
+        ("fa-image", ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp')),    # 图片文件
+        ("fa-file-text", ('.pdf', '.doc', '.docx', '.txt', '.rtf')),                 # 文档文件
+        ("fa-table", ('.xls', '.xlsx', '.csv')),                                     # 表格文件
+        ("fa-presentation", ('.ppt', '.pptx')),                                      # 演示文件
+        ("fa-archive", ('.zip', '.rar', '.7z', '.tar', '.gz')),                      # 压缩文件
+        ("fa-video", ('.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv')),              # 视频文件
+        ("fa-music", ('.mp3', '.wav', '.flac', '.aac', '.ogg')),                     # 音频文件
+        ("fa-code", ('.py', '.js', '.html', '.css', '.java', '.cpp', '.c')),         # 代码文件
+        ("fa-cog", ('.exe', '.msi', '.app')),                                        # 可执行文件
+    )
+    for ext in exts
+}
+
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.tiff', '.ico'})
+_TEXT_EXTENSIONS = frozenset({'.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv', '.log'})
+
+# 内核复制失败时用户态回退的缓冲区大小
+_COPY_BUFSIZE = 4 * 1024 * 1024
+
+
+def _kernel_copy(in_fd, out_fd, size, out_start=0):
+    """在内核中把源文件[0, size)复制到目标文件out_start处，返回已复制的字节数（可能小于size）"""
+    offset = 0
+    
+    # copy_file_range: 同文件系统下可走reflink/服务端复制
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(in_fd, out_fd, size - offset, offset, out_start + offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            pass
+    
+    # sendfile: 跨文件系统或copy_file_range不可用时的内核态回退
+    if offset < size and hasattr(os, 'sendfile'):
+        try:
+            os.lseek(out_fd, out_start + offset, os.SEEK_SET)
+            while offset < size:
+                copied = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            pass
+    
+    return offset
+
+
+def _copy_metadata_fd(in_fd, out_fd, src_st):
+    """通过文件描述符复制元数据（等价于copystat），免去按路径的重复查找"""
+    if hasattr(os, 'listxattr'):
+        try:
+            names = os.listxattr(in_fd)
+        except OSError:
+            names = []
+        for name in names:
+            try:
+                os.setxattr(out_fd, name, os.getxattr(in_fd, name))
+            except OSError:
+                pass
+    
+    os.utime(out_fd, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+    os.chmod(out_fd, stat.S_IMODE(src_st.st_mode))
+
+
+@functools.lru_cache(maxsize=512)
+def _mime_for_suffix(suffix):
+    """按扩展名缓存MIME类型推断结果"""
+    return mimetypes.guess_type('x' + suffix)[0]
+
 class FileUtils:
     """文件操作工具类"""
     
@@ -19,13 +113,12 @@ class FileUtils:
         if size_bytes == 0:
             return "0 B"
         
-        size_names = ["B", "KB", "MB", "GB", "TB", "PB"]
         i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
+        while size_bytes >= 1024 and i < len(_SIZE_UNITS) - 1:
             size_bytes /= 1024.0
             i += 1
         
-        return f"{size_bytes:.1f} {size_names[i]}"
+        return f"{size_bytes:.1f} {_SIZE_UNITS[i]}"
     
     @staticmethod
     def get_file_icon(filename):
@@ -34,62 +127,26 @@ class FileUtils:
             return "fa-file"
         
         ext = os.path.splitext(filename)[1].lower()
-        
-        # 图片文件
-        if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp']:
-            return "fa-image"
-        
-        # 文档文件
-        elif ext in ['.pdf', '.doc', '.docx', '.txt', '.rtf']:
-            return "fa-file-text"
-        
-        # 表格文件
-        elif ext in ['.xls', '.xlsx', '.csv']:
-            return "fa-table"
-        
-        # 演示文件
-        elif ext in ['.ppt', '.pptx']:
-            return "fa-presentation"
-        
-        # 压缩文件
-        elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-            return "fa-archive"
-        
-        # 视频文件
-        elif ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv']:
-            return "fa-video"
-        
-        # 音频文件
-        elif ext in ['.mp3', '.wav', '.flac', '.aac', '.ogg']:
-            return "fa-music"
-        
-        # 代码文件
-        elif ext in ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c']:
-            return "fa-code"
-        
-        # 可执行文件
-        elif ext in ['.exe', '.msi', '.app']:
-            return "fa-cog"
-        
-        else:
-            return "fa-file"
+        return _ICON_BY_EXT.get(ext, "fa-file")
     
     @staticmethod
     def is_image_file(filename):
         """判断是否为图片文件"""
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.tiff', '.ico'}
-        return os.path.splitext(filename)[1].lower() in image_extensions
+        return os.path.splitext(filename)[1].lower() in _IMAGE_EXTENSIONS
     
     @staticmethod
     def is_text_file(filename):
         """判断是否为文本文件"""
-        text_extensions = {'.txt', '.md', '.py', '.js', '.html', '.css', '.json', '.xml', '.csv', '.log'}
-        return os.path.splitext(filename)[1].lower() in text_extensions
+        return os.path.splitext(filename)[1].lower() in _TEXT_EXTENSIONS
     
     @staticmethod
     def get_mime_type(filename):
         """获取文件的MIME类型"""
-        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        root, ext = os.path.splitext(filename)
+        # .gz等压缩后缀的类型由前一个扩展名决定（如 .tar.gz）
+        if ext.lower() in mimetypes.encodings_map:
+            ext = os.path.splitext(root)[1] + ext
+        return _mime_for_suffix(ext.lower()) or 'application/octet-stream'
     
     @staticmethod
     def calculate_file_hash(file_path, algorithm='md5'):
@@ -105,8 +162,15 @@ class FileUtils:
                 raise ValueError(f"不支持的哈希算法: {algorithm}")
             
             with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_func.update(chunk)
+                fd = f.fileno()
+                if os.fstat(fd).st_size < _MMAP_MIN_SIZE:
+                    hash_func.update(f.read())
+                else:
+                    # 映射整个文件直接计算哈希，避免逐块分配bytes对象
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                        hash_func.update(mm)
             
             return hash_func.hexdigest()
         except Exception as e:
@@ -170,7 +234,23 @@ class FileUtils:
     
     @staticmethod
     def is_safe_path(path):
-        """检查路径是否安全"""
+        """检查路径是否安全
+        
+        结果只取决于路径字符串本身和配置的根目录，不访问文件系统；
+        按(路径, 当前根目录)缓存，重新加载配置改变根目录后旧结果不会再命中
+        """
+        # 获取系统配置的根目录，无法获取配置时使用当前工作目录作为备选
+        try:
+            from core.config import config
+            system_root = os.path.abspath(config.FILESYSTEM_ROOT)
+        except Exception:
+            system_root = os.getcwd()
+        return FileUtils._is_safe_path(path, system_root)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _is_safe_path(path, system_root):
+        """is_safe_path的实现，system_root参与缓存键"""
         # 允许空字符串或"."表示根目录
         if path is None:
             return False
@@ -178,39 +258,22 @@ class FileUtils:
             return True
         
         # 检查是否包含危险字符
-        dangerous_chars = ['..', '\\\\', '//', '*', '?', '"', '<', '>', '|']
-        for char in dangerous_chars:
-            if char in path:
-                return False
+        if _DANGEROUS_PATH_RE.search(path):
+            return False
         
         # 检查是否为绝对路径，但允许项目内部的绝对路径
         if os.path.isabs(path):
-            # 获取系统配置的根目录
+            # 按路径组件比较，"/data/root2"不会被误认为在"/data/root"之内
             try:
-                from core.config import config
-                system_root = config.FILESYSTEM_ROOT
-                # 检查路径是否在系统根目录内
-                abs_path = os.path.abspath(path)
-                if not abs_path.startswith(system_root):
-                    return False
-            except:
-                # 如果无法获取配置，使用当前工作目录作为备选
-                current_dir = os.getcwd()
-                try:
-                    abs_path = os.path.abspath(path)
-                    if not abs_path.startswith(current_dir):
-                        return False
-                except:
+                if os.path.commonpath([os.path.abspath(path), system_root]) != system_root:
                     return False
+            except ValueError:
+                return False
         
         # 暂时禁用系统目录检查
         # TODO: 后续需要重新启用并优化检查逻辑
-        pass
         
-        # 检查路径是否试图跳出当前目录
-        normalized_path = os.path.normpath(path)
-        if normalized_path.startswith('..') or '/..' in normalized_path or '\\..' in normalized_path:
-            return False
+        # 跳出当前目录的".."已由_DANGEROUS_PATH_RE拒绝，无需再规范化路径检查
         
         # 暂时禁用扩展名检查，允许所有文件操作
         # TODO: 后续需要重新启用并修复配置加载问题
@@ -219,29 +282,110 @@ class FileUtils:
         return True
     
     @staticmethod
-    def get_file_info(file_path):
-        """获取文件信息"""
+    def fast_copy(src, dst):
+        """复制单个文件并保留元数据（copy2语义），优先在内核中完成数据复制
+        
+        可作为shutil.copytree的copy_function
+        """
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+            src_st = os.fstat(in_fd)
+            size = src_st.st_size
+            offset = _kernel_copy(in_fd, out_fd, size)
+            
+            # 内核复制不可用或未完成时，从断点继续用户态复制
+            if offset < size:
+                fsrc.seek(offset)
+                fdst.seek(offset)
+                shutil.copyfileobj(fsrc, fdst, _COPY_BUFSIZE)
+                fdst.flush()
+            
+            _copy_metadata_fd(in_fd, out_fd, src_st)
+        
+        return dst
+    
+    @staticmethod
+    def copy_file_into(src, out_fd, out_offset):
+        """将src的全部内容写入已打开的目标文件描述符out_fd的out_offset处，返回写入字节数
+        
+        用于把多个文件依次拼接到同一目标文件，数据不经过Python缓冲区
+        """
+        with open(src, 'rb') as fsrc:
+            in_fd = fsrc.fileno()
+            size = os.fstat(in_fd).st_size
+            copied = _kernel_copy(in_fd, out_fd, size, out_offset)
+            
+            # 内核复制不可用或未完成时，用pread/pwrite按位置续写
+            while copied < size:
+                data = os.pread(in_fd, min(_COPY_BUFSIZE, size - copied), copied)
+                if not data:
+                    break
+                view = memoryview(data)
+                while view:
+                    written = os.pwrite(out_fd, view, out_offset + copied)
+                    copied += written
+                    view = view[written:]
+        
+        return copied
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def path_digest(path):
+        """路径的16位十六进制摘要，用于缓存键
+        
+        安装了xxhash时使用xxh3_64，否则使用blake2b（8字节摘要）；同一路径只计算一次
+        """
+        data = path.encode('utf-8')
+        if xxhash is not None:
+            return xxhash.xxh3_64_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+    
+    @staticmethod
+    def stat_or_none(file_path, follow_symlinks=True):
+        """一次stat获取路径状态，路径不存在时返回None
+        
+        follow_symlinks为False时等同lstat，符号链接返回链接自身的状态
+        """
+        try:
+            return os.stat(file_path, follow_symlinks=follow_symlinks)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+    
+    @staticmethod
+    def get_file_info(file_path, st=None, name=None, as_str=False):
+        """获取文件信息
+        
+        st: 调用方已持有的os.stat结果，传入时不再重复stat
+        name: 调用方已知的文件名，传入时不再从路径中解析
+        as_str: 为True时时间字段直接以ISO格式字符串返回，便于JSON序列化
+        """
         try:
-            if not os.path.exists(file_path):
-                return None
+            if st is None:
+                st = FileUtils.stat_or_none(file_path)
+                if st is None:
+                    return None
             
-            stat = os.stat(file_path)
-            is_directory = os.path.isdir(file_path)
+            is_directory = stat.S_ISDIR(st.st_mode)
+            created_time = datetime.fromtimestamp(st.st_ctime)
+            modified_time = datetime.fromtimestamp(st.st_mtime)
+            if as_str:
+                created_time = created_time.isoformat()
+                modified_time = modified_time.isoformat()
             
             file_info = {
-                'name': os.path.basename(file_path),
+                'name': name if name is not None else os.path.basename(file_path),
                 'path': file_path,
-                'size': stat.st_size if not is_directory else 0,
+                'size': st.st_size if not is_directory else 0,
                 'is_directory': is_directory,
-                'created_time': datetime.fromtimestamp(stat.st_ctime),
-                'modified_time': datetime.fromtimestamp(stat.st_mtime),
-                'permissions': oct(stat.st_mode)[-3:],
+                'created_time': created_time,
+                'modified_time': modified_time,
+                'permissions': oct(st.st_mode)[-3:],
                 'mime_type': FileUtils.get_mime_type(file_path) if not is_directory else None,
                 'file_type': os.path.splitext(file_path)[1] if not is_directory else None
             }
             
             # 计算文件哈希（仅对小于10MB的文件）
-            if not is_directory and stat.st_size < 10 * 1024 * 1024:
+            if not is_directory and st.st_size < 10 * 1024 * 1024:
                 try:
                     file_info['hash_value'] = FileUtils.calculate_file_hash(file_path)
                 except:
@@ -253,6 +397,62 @@ class FileUtils:
             return None
     
     @staticmethod
+    def get_file_info_from_entry(entry, as_str=False):
+        """从os.scandir产出的DirEntry获取文件信息
+        
+        直接复用DirEntry的名称、路径和stat缓存，避免重复解析路径和stat
+        """
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        return FileUtils.get_file_info(entry.path, st=st, name=entry.name, as_str=as_str)
+    
+    @staticmethod
+    def get_file_info_columnar(entries):
+        """按列（结构数组）获取一组DirEntry的文件信息
+        
+        返回 {字段名: [值, ...]}，各列按entries顺序对齐，无法stat的条目被跳过。
+        不创建逐条目的字典，也不计算文件哈希，适合大目录的列表展示。
+        """
+        names, paths, sizes, is_dirs = [], [], [], []
+        created, modified, permissions, mime_types, file_types = [], [], [], [], []
+        
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            
+            is_directory = stat.S_ISDIR(st.st_mode)
+            names.append(entry.name)
+            paths.append(entry.path)
+            sizes.append(0 if is_directory else st.st_size)
+            is_dirs.append(is_directory)
+            created.append(datetime.fromtimestamp(st.st_ctime).isoformat())
+            modified.append(datetime.fromtimestamp(st.st_mtime).isoformat())
+            permissions.append(oct(st.st_mode)[-3:])
+            if is_directory:
+                mime_types.append(None)
+                file_types.append(None)
+            else:
+                mime_types.append(FileUtils.get_mime_type(entry.name))
+                file_types.append(os.path.splitext(entry.name)[1])
+        
+        return {
+            'name': names,
+            'path': paths,
+            'size': sizes,
+            'is_directory': is_dirs,
+            'created_time': created,
+            'modified_time': modified,
+            'permissions': permissions,
+            'mime_type': mime_types,
+            'file_type': file_types
+        }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def format_file_size(size_bytes):
         """格式化文件大小显示"""
         return FileUtils.get_file_size_display(size_bytes)
\ No newline at end of file
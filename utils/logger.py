@@ -74,8 +74,18 @@ class StructuredLogger:
         self.name = name
         self.logger = logger
     
-    def _log_with_context(self, level: int, message: str, **kwargs):
-        """记录带上下文的日志"""
+    def isEnabledFor(self, level: int) -> bool:
+        """检查指定级别是否会被记录"""
+        return self.logger.isEnabledFor(level)
+    
+    def _log_with_context(self, level: int, message: str, *args, **kwargs):
+        """记录带上下文的日志
+        
+        message支持%格式化参数，级别未启用时不构造记录也不格式化
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        
         extra_fields = {
             'context': kwargs.get('context', {}),
             'user_id': kwargs.get('user_id'),
@@ -92,30 +102,30 @@ class StructuredLogger:
         extra_fields = {k: v for k, v in extra_fields.items() if v is not None}
         
         record = self.logger.makeRecord(
-            self.name, level, '', 0, message, (), None, 
+            self.name, level, '', 0, message, args, None, 
             extra={'extra_fields': extra_fields}
         )
         self.logger.handle(record)
     
-    def debug(self, message: str, **kwargs):
-        self._log_with_context(logging.DEBUG, message, **kwargs)
+    def debug(self, message: str, *args, **kwargs):
+        self._log_with_context(logging.DEBUG, message, *args, **kwargs)
     
-    def info(self, message: str, **kwargs):
-        self._log_with_context(logging.INFO, message, **kwargs)
+    def info(self, message: str, *args, **kwargs):
+        self._log_with_context(logging.INFO, message, *args, **kwargs)
     
-    def warning(self, message: str, **kwargs):
-        self._log_with_context(logging.WARNING, message, **kwargs)
+    def warning(self, message: str, *args, **kwargs):
+        self._log_with_context(logging.WARNING, message, *args, **kwargs)
     
-    def error(self, message: str, **kwargs):
-        self._log_with_context(logging.ERROR, message, **kwargs)
+    def error(self, message: str, *args, **kwargs):
+        self._log_with_context(logging.ERROR, message, *args, **kwargs)
     
-    def critical(self, message: str, **kwargs):
-        self._log_with_context(logging.CRITICAL, message, **kwargs)
+    def critical(self, message: str, *args, **kwargs):
+        self._log_with_context(logging.CRITICAL, message, *args, **kwargs)
     
-    def exception(self, message: str, **kwargs):
+    def exception(self, message: str, *args, **kwargs):
         """记录异常日志"""
         kwargs['exception'] = True
-        self._log_with_context(logging.ERROR, message, **kwargs)
+        self._log_with_context(logging.ERROR, message, *args, **kwargs)
 
 class LoggerManager:
     """日志管理器"""